@@ -0,0 +1,65 @@
+"""
+Shared response cache for the book catalog.
+
+Cache keys embed a catalog version that is bumped on every ``Book``
+write, so a write invalidates all cached pages at once instead of
+waiting for a TTL to run out.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from library_service_api.change_markers import get_marker, touch_on_commit
+from library_service_api.replicas import primary_reads
+
+CACHE_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_catalog_version() -> int:
+    version, _ = get_marker("books")
+    return version
+
+
+def invalidate_catalog() -> None:
+    touch_on_commit("books")
+
+
+def catalog_cache_key(*parts) -> str:
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f"books:{get_catalog_version()}:{digest}"
+
+
+def get_or_fetch(key: str, fetch):
+    """
+    Return the cached value for ``key`` or compute it with ``fetch``.
+    Concurrent misses are collapsed: one caller fetches while the others
+    wait for its result, falling back to fetching themselves on timeout.
+    Values stored in the cache are read from the primary, since the key's
+    catalog version is already current while a replica may still lag.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            with primary_reads():
+                value = fetch()
+            cache.set(key, value, timeout=CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock_key) is None:
+            break
+    return fetch()
@@ -0,0 +1,178 @@
+"""
+Streaming catalog import.
+
+Rows are read lazily from CSV or NDJSON input, validated against the
+``Book`` field definitions and written in batches, so memory use does
+not grow with the size of the input. Rows are matched to existing books
+by title, author and cover: matches are updated, the rest are created.
+Nothing in the database makes that triple unique, so each batch holds a
+PostgreSQL advisory lock from its lookup to its writes; concurrent
+imports, from the API or the command, take turns per batch and cannot
+both create the same book.
+
+Input that is not valid UTF-8 is decoded with ``surrogateescape``, so a
+bad byte rejects the row it is in rather than the whole import.
+"""
+import csv
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from books.cache import invalidate_catalog
+from books.models import Book
+
+IMPORT_FIELDS = ("title", "author", "cover", "inventory", "daily_fee")
+UPDATE_FIELDS = ("inventory", "daily_fee")
+BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+# Arbitrary, but fixed: every import process must use the same lock.
+IMPORT_LOCK_ID = 0x626F6F6B
+FORMATS = ("csv", "ndjson")
+INPUT_ENCODING = "utf-8"
+INPUT_ERRORS = "surrogateescape"
+# Bytes that failed to decode, as left in the text by ``surrogateescape``.
+UNDECODED_BYTE = re.compile("[\udc80-\udcff]")
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def seconds(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def reject(self, row: int, error) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def decode_lines(lines: Iterable[bytes]) -> Iterator[str]:
+    for line in lines:
+        yield line.decode(INPUT_ENCODING, INPUT_ERRORS)
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[dict]:
+    if fmt == "csv":
+        yield from csv.DictReader(lines)
+    elif fmt == "ndjson":
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield e
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def clean_row(row: dict) -> dict:
+    """Validate a row with the Book model fields, raising ValidationError."""
+    if isinstance(row, json.JSONDecodeError):
+        raise ValidationError(f"Invalid JSON: {row.msg}.")
+    if not isinstance(row, dict):
+        raise ValidationError("Row must be an object.")
+    if any(isinstance(value, str) and UNDECODED_BYTE.search(value) for value in row.values()):
+        raise ValidationError(f"Row is not valid {INPUT_ENCODING}.")
+    cleaned = {}
+    errors = {}
+    for name in IMPORT_FIELDS:
+        try:
+            cleaned[name] = Book._meta.get_field(name).clean(row.get(name), None)
+        except ValidationError as e:
+            errors[name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def lock_imports() -> None:
+    """Wait for other imports' batches; the lock is released when the transaction ends."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [IMPORT_LOCK_ID])
+
+
+def upsert_batch(rows: list[dict], report: ImportReport) -> None:
+    # The last occurrence of a book within a batch wins.
+    by_key = {(row["title"], row["author"], row["cover"]): row for row in rows}
+    with transaction.atomic():
+        lock_imports()
+        existing = {}
+        for book in Book.objects.filter(
+            title__in={key[0] for key in by_key},
+            author__in={key[1] for key in by_key}
+        ).only("id", "title", "author", "cover").order_by("id"):
+            existing.setdefault((book.title, book.author, book.cover), book)
+
+        to_update = []
+        to_create = []
+        for key, row in by_key.items():
+            book = existing.get(key)
+            if book is None:
+                to_create.append(Book(**row))
+            else:
+                for name in UPDATE_FIELDS:
+                    setattr(book, name, row[name])
+                to_update.append(book)
+
+        Book.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        Book.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=BATCH_SIZE)
+    invalidate_catalog()
+    report.created += len(to_create)
+    report.updated += len(to_update)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_books(
+        lines: Iterable[str],
+        fmt: str,
+        batch_size: int = BATCH_SIZE,
+        progress: Callable[[ImportReport], None] = None
+) -> ImportReport:
+    report = ImportReport()
+    for chunk in batched(enumerate(read_rows(lines, fmt), start=1), batch_size):
+        batch = []
+        for number, row in chunk:
+            report.rows += 1
+            try:
+                batch.append(clean_row(row))
+            except ValidationError as e:
+                report.reject(number, e.message_dict if hasattr(e, "error_dict") else e.messages)
+        if batch:
+            upsert_batch(batch, report)
+        if progress:
+            progress(report)
+    return report
@@ -0,0 +1,71 @@
+from django.db.models import Case, F, IntegerField, Value, When
+
+from books.cache import invalidate_catalog
+from books.models import Book
+
+
+def reserve_copy(book_id: int) -> bool:
+    """
+    Take one copy of a book off the shelf with a single conditional
+    UPDATE. Concurrent callers queue on the row lock and re-check the
+    condition, so the inventory never drops below zero and no update
+    is lost. Returns False when the book is out of stock.
+    """
+    reserved = bool(
+        Book.objects.filter(pk=book_id, inventory__gt=0).update(
+            inventory=F("inventory") - 1
+        )
+    )
+    if reserved:
+        invalidate_catalog()
+    return reserved
+
+
+def release_copy(book_id: int) -> None:
+    """Put one copy of a book back on the shelf."""
+    Book.objects.filter(pk=book_id).update(inventory=F("inventory") + 1)
+    invalidate_catalog()
+
+
+def lock_books(book_ids) -> dict[int, int]:
+    """
+    Lock the rows of several books, always in primary key order, so two
+    batches over overlapping books queue behind each other instead of
+    deadlocking. Returns the inventory of every book found.
+    """
+    return dict(
+        Book.objects.select_for_update()
+        .filter(pk__in=book_ids)
+        .order_by("pk")
+        .values_list("pk", "inventory")
+    )
+
+
+def reserve_copies(book_ids) -> list[int]:
+    """
+    Take one copy of each book off the shelf, all or nothing, with one
+    UPDATE. Must run inside a transaction. Returns the books that are out
+    of stock, in which case nothing is reserved.
+    """
+    inventory = lock_books(book_ids)
+    out_of_stock = [book_id for book_id in book_ids if inventory.get(book_id, 0) <= 0]
+    if out_of_stock:
+        return out_of_stock
+
+    Book.objects.filter(pk__in=book_ids).update(inventory=F("inventory") - 1)
+    invalidate_catalog()
+    return []
+
+
+def release_copies(copies: dict[int, int]) -> None:
+    """Put ``copies[book_id]`` copies of each book back with one UPDATE."""
+    if not copies:
+        return
+    lock_books(copies)
+    Book.objects.filter(pk__in=copies).update(
+        inventory=F("inventory") + Case(
+            *(When(pk=book_id, then=Value(count)) for book_id, count in copies.items()),
+            output_field=IntegerField()
+        )
+    )
+    invalidate_catalog()
@@ -0,0 +1,71 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    """Measure request latency and connection churn of the configured DB_CONNECTION_MODE"""
+
+    help = "Benchmark database connection handling at several concurrency levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Simulated requests per thread.")
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("Connection benchmarks need PostgreSQL.")
+
+        self.stdout.write(f"DB_CONNECTION_MODE={settings.DB_CONNECTION_MODE}")
+        self.stdout.write(
+            f"{'threads':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'backends':>10}"
+        )
+        for threads in options["concurrency"]:
+            latencies, backends, seconds = self.run(threads, options["requests"])
+            self.stdout.write(
+                f"{threads:>8}{len(latencies) / seconds:>10.0f}"
+                f"{statistics.median(latencies):>10.2f}"
+                f"{statistics.quantiles(latencies, n=20)[-1]:>10.2f}"
+                f"{len(backends):>10}"
+            )
+
+    @staticmethod
+    def simulate_request() -> tuple[float, int]:
+        """One request cycle: the signals close stale connections as in a real request."""
+        started = time.perf_counter()
+        request_started.send(sender=None)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_backend_pid()")
+                backend = cursor.fetchone()[0]
+        finally:
+            request_finished.send(sender=None)
+        return (time.perf_counter() - started) * 1000, backend
+
+    def run(self, threads: int, requests: int) -> tuple[list, set, float]:
+        latencies = []
+        backends = set()
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                results = [self.simulate_request() for _ in range(requests)]
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(latency for latency, _ in results)
+                backends.update(backend for _, backend in results)
+
+        started = time.monotonic()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return latencies, backends, time.monotonic() - started
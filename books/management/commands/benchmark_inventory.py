@@ -0,0 +1,77 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from books.inventory import reserve_copy
+from books.models import Book
+
+
+class Command(BaseCommand):
+    """Hammer a single book with concurrent reservations and check the result"""
+
+    help = "Benchmark concurrent inventory reservations against one book."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--attempts", type=int, default=100,
+                            help="Reservation attempts per thread.")
+        parser.add_argument("--inventory", type=int, default=1000,
+                            help="Starting inventory of the benchmark book.")
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor == "sqlite":
+            raise CommandError("This benchmark needs a database with row-level locking.")
+
+        book = Book.objects.create(
+            title="Inventory benchmark",
+            author="benchmark",
+            cover=Book.Cover.SOFT,
+            inventory=options["inventory"],
+            daily_fee=0
+        )
+        reserved = []
+        rejected = []
+        lock = threading.Lock()
+
+        def worker():
+            ok = failed = 0
+            try:
+                for _ in range(options["attempts"]):
+                    if reserve_copy(book.id):
+                        ok += 1
+                    else:
+                        failed += 1
+            finally:
+                connection.close()
+            with lock:
+                reserved.append(ok)
+                rejected.append(failed)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        book.refresh_from_db()
+        total_reserved = sum(reserved)
+        attempts = options["threads"] * options["attempts"]
+        correct = (
+            book.inventory >= 0
+            and book.inventory == options["inventory"] - total_reserved
+        )
+        book.delete()
+
+        self.stdout.write(
+            f"{attempts} attempts from {options['threads']} threads in {elapsed:.2f}s "
+            f"({attempts / elapsed:.0f} ops/s)\n"
+            f"reserved: {total_reserved}, rejected: {sum(rejected)}, "
+            f"final inventory: {book.inventory}"
+        )
+        if not correct:
+            raise CommandError("Inventory drifted: lost or duplicated updates detected.")
+        self.stdout.write(self.style.SUCCESS("Inventory is consistent"))
@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from books.cache import invalidate_catalog
+from books.models import Book
+from books.search import search_books
+
+SYNTHETIC_AUTHOR_PREFIX = "Synthetic Author"
+WORDS = (
+    "shadow", "river", "empire", "garden", "winter", "letters", "silent", "ocean",
+    "mountain", "secret", "history", "journey", "machine", "kingdom", "memory",
+    "stars", "island", "night", "forest", "city", "fire", "glass", "storm", "house",
+    "war", "peace", "light", "dream", "stone", "crown", "wolf", "bridge",
+)
+QUERIES = ("silent ocean", "histroy", "kingdom of glass", "wolf", "mountian storm")
+
+
+class Command(BaseCommand):
+    """Compare index-backed catalog search with a naive icontains scan"""
+
+    help = "Benchmark book search over a synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the synthetic catalog for the next run.")
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("Catalog search benchmarks need PostgreSQL.")
+
+        synthetic = Book.objects.filter(author__startswith=SYNTHETIC_AUTHOR_PREFIX)
+        missing = options["books"] - synthetic.count()
+        if missing > 0:
+            self.generate(missing, options["batch_size"])
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Book._meta.db_table}")
+
+        self.stdout.write(f"{'query':<20}{'search ms':>12}{'icontains ms':>15}{'hits':>8}")
+        for query in QUERIES:
+            indexed = self.measure(
+                lambda: list(search_books(Book.objects.all(), query)[:20]),
+                options["repeat"]
+            )
+            naive = self.measure(
+                lambda: list(Book.objects.filter(
+                    Q(title__icontains=query) | Q(author__icontains=query)
+                )[:20]),
+                options["repeat"]
+            )
+            hits = search_books(Book.objects.all(), query).count()
+            self.stdout.write(f"{query:<20}{indexed:>12.2f}{naive:>15.2f}{hits:>8}")
+
+        if not options["keep"]:
+            # A raw delete skips collecting a million rows for post_delete.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Book._meta.db_table} WHERE author LIKE %s",
+                    [f"{SYNTHETIC_AUTHOR_PREFIX}%"]
+                )
+            invalidate_catalog()
+
+    def generate(self, count: int, batch_size: int) -> None:
+        self.stdout.write(f"Generating {count} synthetic books...")
+        rng = random.Random(42)
+        for start in range(0, count, batch_size):
+            Book.objects.bulk_create([
+                Book(
+                    title=" ".join(rng.choices(WORDS, k=rng.randint(2, 5))).capitalize(),
+                    author=f"{SYNTHETIC_AUTHOR_PREFIX} {rng.randint(1, 50_000)}",
+                    cover=rng.choice(Book.Cover.values),
+                    inventory=rng.randint(0, 20),
+                    daily_fee=rng.randint(10, 300) / 100
+                )
+                for _ in range(min(batch_size, count - start))
+            ])
+        invalidate_catalog()
+
+    @staticmethod
+    def measure(run, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importers import BATCH_SIZE, FORMATS, INPUT_ENCODING, INPUT_ERRORS, import_books
+
+
+class Command(BaseCommand):
+    """Django command to stream a CSV or NDJSON catalog into the books table"""
+
+    help = "Import books from a CSV or NDJSON file, updating existing ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the catalog file, or '-' for stdin.")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Input format. Guessed from the file extension by default.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options) -> None:
+        path = options["path"]
+        fmt = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if fmt not in FORMATS:
+            raise CommandError("Pass --format csv or --format ndjson.")
+
+        def progress(report):
+            self.stdout.write(
+                f"{report.rows} rows, {report.created} created, {report.updated} updated, "
+                f"{report.rejected} rejected ({report.rows_per_second:.0f} rows/s)"
+            )
+
+        if path == "-":
+            stdin = open(
+                sys.stdin.fileno(), encoding=INPUT_ENCODING, errors=INPUT_ERRORS,
+                newline="", closefd=False
+            )
+            report = import_books(stdin, fmt, options["batch_size"], progress)
+        else:
+            with open(path, encoding=INPUT_ENCODING, errors=INPUT_ERRORS, newline="") as lines:
+                report = import_books(lines, fmt, options["batch_size"], progress)
+
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.rows - report.rejected} of {report.rows} rows "
+            f"in {report.seconds:.1f}s ({report.rows_per_second:.0f} rows/s)"
+        ))
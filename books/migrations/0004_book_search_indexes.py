@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from library_service_api.operations import AddPostgresIndex, TrigramExtension
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_book_inventory_non_negative"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddPostgresIndex(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    "title", "author", config="english"
+                ),
+                name="book_search_idx",
+            ),
+        ),
+        AddPostgresIndex(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="book_title_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        AddPostgresIndex(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["author"],
+                name="book_author_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
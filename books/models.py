@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 
 
@@ -14,6 +16,28 @@ class Book(models.Model):
 
     class Meta:
         ordering = ("title",)
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(inventory__gte=0),
+                name="book_inventory_non_negative"
+            )
+        ]
+        indexes = [
+            GinIndex(
+                SearchVector("title", "author", config="english"),
+                name="book_search_idx"
+            ),
+            GinIndex(
+                fields=["title"],
+                name="book_title_trgm_idx",
+                opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["author"],
+                name="book_author_trgm_idx",
+                opclasses=["gin_trgm_ops"]
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.author}"
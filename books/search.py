@@ -0,0 +1,39 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity
+)
+from django.db import connection
+from django.db.models import F, Q, QuerySet
+from django.db.models.functions import Greatest
+
+SEARCH_CONFIG = "english"
+
+# Must stay identical to the expression of the "book_search_idx" index,
+# otherwise Postgres can't use the index for the lookup.
+SEARCH_VECTOR = SearchVector("title", "author", config=SEARCH_CONFIG)
+
+
+def search_books(queryset: QuerySet, term: str) -> QuerySet:
+    """
+    Match books by full-text search over title and author, or by trigram
+    word similarity for misspelled terms, best matches first.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.filter(Q(title__icontains=term) | Q(author__icontains=term))
+
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type="websearch")
+    return queryset.annotate(
+        search=SEARCH_VECTOR,
+        similarity=Greatest(
+            TrigramWordSimilarity(term, "title"),
+            TrigramWordSimilarity(term, "author")
+        )
+    ).filter(
+        Q(search=query)
+        | Q(title__trigram_word_similar=term)
+        | Q(author__trigram_word_similar=term)
+    ).annotate(
+        rank=SearchRank(F("search"), query) + F("similarity")
+    ).order_by("-rank", "title", "id")
@@ -0,0 +1,5 @@
+# Queries per request, counted in tests (savepoints included).
+QUERY_BUDGETS = {
+    "book-list": 2,
+    "book-retrieve": 1,
+}
@@ -1,4 +1,7 @@
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -7,6 +10,7 @@ from rest_framework.test import APIClient
 
 from books.models import Book
 from books.serializers import BookSerializer
+from library_service_api.pagination import MAX_PAGE_SIZE
 
 BOOK_URL = reverse("books:book-list")
 
@@ -52,6 +56,72 @@ class AuthenticatedBookApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_list_books_cursor_pagination(self):
+        for index in range(7):
+            sample_book(title=f"Title {index}")
+
+        res = self.client.get(BOOK_URL, {"pagination": "cursor"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        self.assertEqual(len(res.data["results"]), 5)
+
+        res_next = self.client.get(res.data["next"])
+        titles = [
+            book["title"]
+            for book in res.data["results"] + res_next.data["results"]
+        ]
+        self.assertEqual(
+            titles,
+            list(Book.objects.order_by("id").values_list("title", flat=True))
+        )
+        self.assertIsNone(res_next.data["next"])
+
+    def test_cursor_pagination_survives_duplicate_titles_and_renames(self):
+        books = [sample_book(title="Same") for _ in range(4)]
+
+        res = self.client.get(BOOK_URL, {"pagination": "cursor", "page_size": 2})
+        Book.objects.filter(id=books[0].id).update(title="Renamed")
+        res_next = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [book["id"] for book in res.data["results"] + res_next.data["results"]],
+            [book.id for book in books]
+        )
+
+    def test_list_books_page_size_is_capped(self):
+        Book.objects.bulk_create(
+            Book(title=f"Title {index}", author="TestAuthor", cover="Hard", inventory=1, daily_fee=1)
+            for index in range(MAX_PAGE_SIZE + 1)
+        )
+
+        res = self.client.get(BOOK_URL, {"page_size": 2})
+        self.assertEqual(len(res.data["results"]), 2)
+
+        res = self.client.get(BOOK_URL, {"page_size": 10_000})
+        self.assertEqual(len(res.data["results"]), MAX_PAGE_SIZE)
+
+        res = self.client.get(BOOK_URL, {"pagination": "cursor", "page_size": 10_000})
+        self.assertEqual(len(res.data["results"]), MAX_PAGE_SIZE)
+
+    def test_search_books_by_title_and_author(self):
+        dune = sample_book(title="Dune", author="Frank Herbert")
+        emma = sample_book(title="Emma", author="Jane Austen")
+
+        res_title = self.client.get(BOOK_URL, {"search": "dune"})
+        res_author = self.client.get(BOOK_URL, {"search": "austen"})
+
+        self.assertEqual([book["id"] for book in res_title.data["results"]], [dune.id])
+        self.assertEqual([book["id"] for book in res_author.data["results"]], [emma.id])
+
+    @skipUnless(connection.vendor == "postgresql", "Trigram search needs PostgreSQL")
+    def test_search_books_tolerates_typos(self):
+        book = sample_book(title="The Brothers Karamazov", author="Fyodor Dostoevsky")
+        sample_book(title="Emma", author="Jane Austen")
+
+        res = self.client.get(BOOK_URL, {"search": "karamazof"})
+
+        self.assertEqual([book["id"] for book in res.data["results"]], [book.id])
+
 
 class AdminBookTest(TestCase):
     def setUp(self):
@@ -0,0 +1,169 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from books.cache import get_or_fetch
+from books.inventory import reserve_copy
+from books.tests.test_books_api import BOOK_URL, sample_book
+from library_service_api.change_markers import get_marker
+from library_service_api.checks import check_shared_cache
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_is_served_from_cache(self):
+        sample_book()
+        self.client.get(BOOK_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(BOOK_URL)
+
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_book_write_invalidates_cache(self):
+        book = sample_book(title="Old title")
+        self.client.get(BOOK_URL)
+
+        book.title = "New title"
+        book.save()
+        res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.data["results"][0]["title"], "New title")
+
+    def test_reservation_invalidates_cache(self):
+        book = sample_book(inventory=3)
+        url = f"{BOOK_URL}{book.id}/"
+        self.client.get(url)
+
+        reserve_copy(book.id)
+        res = self.client.get(url)
+
+        self.assertEqual(res.data["inventory"], 2)
+
+    def test_query_parameters_are_part_of_the_key(self):
+        sample_book(title="First")
+        sample_book(title="Second")
+
+        res_all = self.client.get(BOOK_URL)
+        res_search = self.client.get(BOOK_URL, {"search": "second"})
+
+        self.assertEqual(len(res_all.data["results"]), 2)
+        self.assertEqual(len(res_search.data["results"]), 1)
+
+    def test_concurrent_misses_fetch_once(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_fetch("books:test", fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 5)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def at(self, seconds):
+        return patch("library_service_api.conditional.time", Mock(time=Mock(return_value=seconds)))
+
+    def test_unchanged_list_is_not_modified(self):
+        sample_book()
+        res = self.client.get(BOOK_URL)
+
+        with self.assertNumQueries(0):
+            res_again = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res_again.status_code, 304)
+        self.assertEqual(res_again["ETag"], res["ETag"])
+
+    def test_if_modified_since_after_the_changes_second(self):
+        sample_book()
+        changed_at = get_marker("books")[1]
+        with self.at(changed_at + 1):
+            res = self.client.get(BOOK_URL)
+            res_again = self.client.get(BOOK_URL, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+
+        self.assertEqual(res_again.status_code, 304)
+
+    def test_no_last_modified_within_the_changes_second(self):
+        book = sample_book()
+        changed_at = get_marker("books")[1]
+        with self.at(changed_at):
+            res = self.client.get(BOOK_URL)
+            book.inventory += 1
+            book.save()
+            res_again = self.client.get(BOOK_URL, HTTP_IF_MODIFIED_SINCE=http_date(changed_at))
+
+        self.assertNotIn("Last-Modified", res)
+        self.assertEqual(res_again.status_code, 200)
+
+    def test_write_changes_etag(self):
+        book = sample_book()
+        res = self.client.get(BOOK_URL)
+
+        book.inventory += 1
+        book.save()
+        res_again = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res_again.status_code, 200)
+        self.assertNotEqual(res_again["ETag"], res["ETag"])
+
+    def test_etag_depends_on_user(self):
+        sample_book()
+        res = self.client.get(BOOK_URL)
+
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        self.client.force_authenticate(other)
+        res_other = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res_other.status_code, 200)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }})
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ["library_service_api.W001"]
+        )
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://localhost:6379",
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,28 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from library_service_api.database import connection_settings
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    def test_persistent_connections_are_health_checked(self):
+        self.assertEqual(
+            connection_settings("persistent"),
+            {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True}
+        )
+
+    def test_pool_mode_disables_persistent_connections(self):
+        options = connection_settings("pool")
+
+        self.assertEqual(options["CONN_MAX_AGE"], 0)
+        self.assertIn("check", options["OPTIONS"]["pool"])
+
+    def test_pgbouncer_mode_avoids_server_side_state(self):
+        options = connection_settings("pgbouncer")
+
+        self.assertTrue(options["DISABLE_SERVER_SIDE_CURSORS"])
+        self.assertIsNone(options["OPTIONS"]["prepare_threshold"])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            connection_settings("sharded")
@@ -0,0 +1,141 @@
+import json
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from books.importers import IMPORT_LOCK_ID, import_books
+from books.models import Book
+from books.tests.test_books_api import sample_book
+from books.views import BookViewSet
+
+IMPORT_URL = reverse("books:book-bulk-import")
+
+CSV_CATALOG = (
+    "title,author,cover,inventory,daily_fee\n"
+    "TestTitle,TestAuthor,Hard,3,0.50\n"
+    "\"Dune, Part One\",Frank Herbert,Soft,7,1.25\n"
+)
+
+
+class ImportBooksTests(TestCase):
+    def test_creates_new_and_updates_existing_books(self):
+        book = sample_book(inventory=25)
+
+        report = import_books(StringIO(CSV_CATALOG), "csv")
+
+        self.assertEqual((report.rows, report.created, report.updated), (2, 1, 1))
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 3)
+        self.assertTrue(Book.objects.filter(title="Dune, Part One", inventory=7).exists())
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        lines = [
+            json.dumps({"title": "Valid", "author": "A", "cover": "Hard",
+                        "inventory": 1, "daily_fee": "0.10"}),
+            json.dumps({"title": "Bad cover", "author": "A", "cover": "Paper",
+                        "inventory": 1, "daily_fee": "0.10"}),
+            "{not json",
+        ]
+
+        report = import_books(lines, "ndjson", batch_size=2)
+
+        self.assertEqual((report.rows, report.created, report.rejected), (3, 1, 2))
+        self.assertEqual([error["row"] for error in report.errors], [2, 3])
+        self.assertIn("cover", report.errors[0]["error"])
+
+    def test_each_batch_takes_the_import_lock(self):
+        mock_connection = MagicMock(vendor="postgresql")
+        cursor = mock_connection.cursor.return_value.__enter__.return_value
+
+        with patch("books.importers.connection", mock_connection):
+            import_books(StringIO(CSV_CATALOG), "csv", batch_size=1)
+
+        self.assertEqual(cursor.execute.call_count, 2)
+        cursor.execute.assert_called_with("SELECT pg_advisory_xact_lock(%s)", [IMPORT_LOCK_ID])
+
+    def test_command_imports_ndjson_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson") as catalog:
+            for index in range(5):
+                catalog.write(json.dumps({
+                    "title": f"Book {index}", "author": "Author", "cover": "Soft",
+                    "inventory": index, "daily_fee": "0.25"
+                }) + "\n")
+            catalog.flush()
+
+            call_command("import_books", catalog.name, "--batch-size", "2", stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 5)
+
+
+class ImportBooksApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_requires_admin(self):
+        res = self.client.post(IMPORT_URL, CSV_CATALOG, content_type="text/csv")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Book.objects.exists())
+
+    def test_admin_imports_csv(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.post(IMPORT_URL, CSV_CATALOG, content_type="text/csv")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_unsupported_content_type(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.post(IMPORT_URL, {"title": "x"}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_invalid_utf8_rejects_only_its_row(self):
+        self.user.is_staff = True
+        self.user.save()
+        catalog = CSV_CATALOG.encode() + b"Caf\xe9,Author,Soft,1,0.50\n"
+
+        res = self.client.post(IMPORT_URL, catalog, content_type="text/csv")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(res.data["rejected"], 1)
+        self.assertEqual(res.data["errors"][0]["row"], 3)
+
+    def test_upload_without_content_length_is_refused(self):
+        self.user.is_staff = True
+        self.user.save()
+        request = APIRequestFactory().post(IMPORT_URL, CSV_CATALOG, content_type="text/csv")
+        del request.META["CONTENT_LENGTH"]
+        request.META["HTTP_TRANSFER_ENCODING"] = "chunked"
+        force_authenticate(request, self.user)
+
+        res = BookViewSet.as_view({"post": "bulk_import"})(request)
+
+        self.assertEqual(res.status_code, status.HTTP_411_LENGTH_REQUIRED)
+        self.assertFalse(Book.objects.exists())
+
+    def test_empty_upload_is_rejected(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.post(IMPORT_URL, "", content_type="text/csv", CONTENT_LENGTH="0")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
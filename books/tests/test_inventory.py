@@ -0,0 +1,36 @@
+from django.db import IntegrityError
+from django.test import TestCase
+
+from books.inventory import release_copy, reserve_copy
+from books.tests.test_books_api import sample_book
+
+
+class InventoryReservationTests(TestCase):
+    def test_reserve_copy_decrements_inventory(self):
+        book = sample_book(inventory=2)
+
+        self.assertTrue(reserve_copy(book.id))
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+    def test_reserve_copy_rejects_out_of_stock(self):
+        book = sample_book(inventory=1)
+
+        self.assertTrue(reserve_copy(book.id))
+        self.assertFalse(reserve_copy(book.id))
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 0)
+
+    def test_release_copy_increments_inventory(self):
+        book = sample_book(inventory=0)
+
+        release_copy(book.id)
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+    def test_negative_inventory_is_rejected_by_database(self):
+        book = sample_book(inventory=0)
+        book.inventory = -1
+
+        with self.assertRaises(IntegrityError):
+            book.save()
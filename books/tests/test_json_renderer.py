@@ -0,0 +1,91 @@
+import io
+import uuid
+from datetime import date, datetime, time, timezone as dt_timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from books.serializers import BookSerializer
+from books.tests.test_books_api import BOOK_URL, sample_book
+from borrowings.serializers import BorrowingSerializer
+from borrowings.tests.test_borrowings_api import sample_borrowing
+from library_service_api.parsers import ORJSONParser
+from library_service_api.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(TestCase):
+    def assertRendersLikeDRF(self, data, accepted_media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type)
+        )
+
+    def test_serializer_output_matches_drf(self):
+        book = sample_book(daily_fee="1.10", title="Ünïcode")
+        borrowing = sample_borrowing(book=book)
+
+        self.assertRendersLikeDRF(BookSerializer(book).data)
+        self.assertRendersLikeDRF(BorrowingSerializer(borrowing).data)
+
+    def test_raw_values_match_drf(self):
+        self.assertRendersLikeDRF({
+            "fee": Decimal("0.25"),
+            "at": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            "naive": datetime(2024, 5, 1, 12, 30, 15, 123456),
+            "on": date(2024, 5, 1),
+            "time": time(9, 5, 1, 500000),
+            "id": uuid.UUID(int=1),
+            "lazy": gettext_lazy("Not found."),
+            "separators": "line\u2028paragraph\u2029",
+            "pages": (1, 2),
+            "big": 2 ** 70,
+        })
+
+    def test_indented_output_matches_drf(self):
+        self.assertRendersLikeDRF({"fee": Decimal("1.5")}, "application/json; indent=4")
+
+    def test_falls_back_without_orjson(self):
+        with patch("library_service_api.renderers.orjson", None):
+            self.assertRendersLikeDRF({"fee": Decimal("1.5")})
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_api_responses_use_orjson_renderer(self):
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user(email="test@test.com", password="testpass")
+        )
+
+        res = client.get(BOOK_URL)
+
+        self.assertIsInstance(res.accepted_renderer, ORJSONRenderer)
+
+
+class ORJSONParserTests(TestCase):
+    def parse(self, content: bytes, encoding="utf-8"):
+        return ORJSONParser().parse(io.BytesIO(content), parser_context={"encoding": encoding})
+
+    def test_parses_like_drf(self):
+        content = '{"title": "Ünïcode", "daily_fee": 1.25, "tags": [null, true]}'.encode()
+
+        self.assertEqual(
+            self.parse(content),
+            JSONParser().parse(io.BytesIO(content), parser_context={})
+        )
+
+    def test_other_encodings_fall_back(self):
+        self.assertEqual(self.parse('{"title": "Ünïcode"}'.encode("utf-16"), "utf-16"),
+                         {"title": "Ünïcode"})
+
+    def test_invalid_json_raises_parse_error(self):
+        for content in (b"{", b'{"fee": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parse(content)
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import BOOK_URL, sample_book
+from library_service_api.query_budget import QueryBudgetTestMixin
+
+
+class BookQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(email="test@test.com", password="testpass")
+        )
+        self.books = [sample_book(title=f"Book {index}") for index in range(5)]
+
+    def test_list(self):
+        with self.assertQueryBudget("book-list"):
+            self.client.get(BOOK_URL)
+
+    def test_retrieve(self):
+        with self.assertQueryBudget("book-retrieve"):
+            self.client.get(reverse("books:book-detail", args=(self.books[0].id,)))
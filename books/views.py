@@ -1,14 +1,61 @@
-from rest_framework import viewsets
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
+from books.cache import catalog_cache_key, get_or_fetch
+from books.importers import decode_lines, import_books
 from books.models import Book
 from books.permissions import IsAdminAllOrAuthenticatedReadOnly
+from books.search import search_books
 from books.serializers import BookSerializer
+from library_service_api.conditional import ConditionalGetMixin
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+class CatalogCacheMixin:
+    """Serve list and retrieve from the shared, version-keyed catalog cache."""
+
+    def catalog_cache_key(self, request, **kwargs):
+        return catalog_cache_key(
+            self.action,
+            request.get_host(),
+            sorted(request.query_params.lists()),
+            sorted(kwargs.items())
+        )
+
+    def list(self, request, *args, **kwargs):
+        data = get_or_fetch(
+            self.catalog_cache_key(request),
+            lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs).data
+        )
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = get_or_fetch(
+            self.catalog_cache_key(request, **kwargs),
+            lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs).data
+        )
+        return Response(data)
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="Retrieve list of books",
         description="Retrieve a list of all books. Authenticated users can view the list, while admins have full access.",
+        parameters=[
+            OpenApiParameter(
+                name="search",
+                description="Search by title and author, tolerating typos. Results are ordered by relevance.",
+                required=False,
+                type=str
+            )
+        ],
         responses={200: BookSerializer(many=True)}
     ),
     retrieve=extend_schema(
@@ -40,7 +87,59 @@ from books.serializers import BookSerializer
         responses={204: None}
     )
 )
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    # CursorPagination positions on the first field only, so it must be
+    # unique and never change; a title is neither.
+    cursor_ordering = ("id",)
+    change_scopes = ("books",)
     permission_classes = (IsAdminAllOrAuthenticatedReadOnly,)
+
+    def get_queryset(self):
+        queryset = self.queryset
+        search = self.request.query_params.get("search")
+
+        if search and self.action == "list":
+            queryset = search_books(queryset, search)
+
+        return queryset
+
+    @extend_schema(
+        summary="Bulk import books",
+        description="Admins can stream a CSV (text/csv) or NDJSON (application/x-ndjson) catalog. Books matching on title, author and cover are updated, the rest are created.",
+        request={
+            "text/csv": {"type": "string", "format": "binary"},
+            "application/x-ndjson": {"type": "string", "format": "binary"},
+        },
+        responses={
+            200: {"description": "Import report"},
+            400: {"description": "Empty catalog"},
+            411: {"description": "Content-Length missing"},
+        }
+    )
+    @action(detail=False, methods=["POST"], url_path="import", permission_classes=(IsAdminUser,))
+    def bulk_import(self, request):
+        fmt = IMPORT_CONTENT_TYPES.get(request.content_type.split(";")[0].strip())
+        if fmt is None:
+            return Response(
+                {"error": "Send text/csv or application/x-ndjson."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        if request.stream is None:
+            # DRF leaves the stream unset without a Content-Length, which
+            # includes chunked uploads, as well as for an empty body.
+            if "CONTENT_LENGTH" not in request.META:
+                return Response(
+                    {"error": "Send the catalog with a Content-Length header."},
+                    status=status.HTTP_411_LENGTH_REQUIRED
+                )
+            return Response(
+                {"error": "The catalog is empty."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = import_books(decode_lines(request.stream), fmt)
+
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
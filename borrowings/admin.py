@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, OutboxMessage
 
 admin.site.register(Borrowing)
+admin.site.register(OutboxMessage)
@@ -0,0 +1,137 @@
+"""
+Daily fines for overdue borrowings.
+
+Every run charges the days since the previous run (the watermark kept in
+``FineRun``), so each day is charged exactly once, even after the beat
+schedule skipped a day. Fines are inserted first and get their Stripe
+sessions afterwards, which makes a run safe to resume after a crash.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta
+
+import stripe
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from borrowings.models import Borrowing
+from library_service_api.change_markers import touch_on_commit
+from payments.models import FineRun, Payment
+from payments.utils import SESSION_LIFETIME, create_checkout_session
+
+logger = logging.getLogger(__name__)
+
+FINE_MULTIPLAYER = 2
+FINES_BATCH_SIZE = 1000
+STRIPE_CONCURRENCY = 8
+# Stripe refuses sessions that expire sooner than 30 minutes after creation.
+MIN_SESSION_LIFETIME = timedelta(hours=1)
+
+
+def get_watermark(run_date: date) -> date:
+    last_run = FineRun.objects.first()
+    return last_run.run_date if last_run else run_date - timedelta(days=1)
+
+
+def record_fines(run_date: date, watermark: date) -> int:
+    """
+    Insert one fine per overdue, unreturned borrowing covering the days
+    after the watermark. Fines are unique per borrowing and run date, so
+    repeating an interrupted run does not charge twice.
+    """
+    start_of_day = timezone.make_aware(datetime.combine(run_date, time.min))
+    rows = Borrowing.objects.filter(
+        actual_return_date__isnull=True,
+        expected_return_date__lt=start_of_day
+    ).annotate(
+        daily_fine=F("book__daily_fee") * FINE_MULTIPLAYER
+    ).values_list(
+        "id", "expected_return_date", "daily_fine"
+    ).order_by("id").iterator(chunk_size=FINES_BATCH_SIZE)
+
+    batch = []
+    for borrowing_id, expected_return_date, daily_fine in rows:
+        charged_from = max(watermark, timezone.localdate(expected_return_date))
+        batch.append(Payment(
+            borrowing_id=borrowing_id,
+            status=Payment.Status.PENDING,
+            type=Payment.Type.FINE,
+            fine_date=run_date,
+            money_to_pay=(run_date - charged_from).days * daily_fine
+        ))
+        if len(batch) == FINES_BATCH_SIZE:
+            Payment.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Payment.objects.bulk_create(batch, ignore_conflicts=True)
+    touch_on_commit("payments")
+
+    return Payment.objects.filter(type=Payment.Type.FINE, fine_date=run_date).count()
+
+
+def fine_idempotency_key(fine: Payment) -> str:
+    return f"fine-{fine.id}-{int(fine.session_expires_at.timestamp())}"
+
+
+def create_fine_sessions() -> int:
+    """
+    Create Stripe sessions for fines that have none yet, several at a time.
+    Each fine's session expiry is stored on the row before its first
+    attempt and is part of its idempotency key, so a retry sends Stripe
+    the same parameters under the same key, and a fine whose session was
+    created right before a crash gets the same session back. An expiry
+    too close to use gets replaced, and with it the key.
+    """
+    fines = Payment.objects.filter(
+        type=Payment.Type.FINE,
+        status=Payment.Status.PENDING,
+        session_id=""
+    )
+    now = timezone.now().replace(microsecond=0)
+    fines.filter(
+        Q(session_expires_at__isnull=True)
+        | Q(session_expires_at__lt=now + MIN_SESSION_LIFETIME)
+    ).update(session_expires_at=now + SESSION_LIFETIME)
+
+    fines = fines.select_related("borrowing__book").order_by("id")
+    created = 0
+    with ThreadPoolExecutor(max_workers=STRIPE_CONCURRENCY) as pool:
+        last_id = 0
+        while batch := list(fines.filter(id__gt=last_id)[:FINES_BATCH_SIZE]):
+            last_id = batch[-1].id
+            futures = {
+                pool.submit(
+                    create_checkout_session,
+                    fine.borrowing.book.title,
+                    fine.money_to_pay,
+                    idempotency_key=fine_idempotency_key(fine),
+                    expires_at=int(fine.session_expires_at.timestamp())
+                ): fine
+                for fine in batch
+            }
+            for future in as_completed(futures):
+                fine = futures[future]
+                try:
+                    session = future.result()
+                except stripe.StripeError:
+                    logger.exception("Failed to create a Stripe session for fine %s", fine.id)
+                    continue
+                created += Payment.objects.filter(pk=fine.pk, session_id="").update(
+                    session_id=session.id,
+                    session_url=session.url
+                )
+    if created:
+        touch_on_commit("payments")
+    return created
+
+
+def charge_fines(run_date: date) -> dict:
+    watermark = get_watermark(run_date)
+    fines = 0
+    if watermark < run_date:
+        fines = record_fines(run_date, watermark)
+        FineRun.objects.create(run_date=run_date, fines=fines)
+    # Lazy fines get their sessions when the borrower asks to pay.
+    sessions = 0 if settings.LAZY_PAYMENT_SESSIONS else create_fine_sessions()
+    return {"run_date": run_date.isoformat(), "fines": fines, "sessions": sessions}
@@ -0,0 +1,102 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from books.models import Book
+from books.serializers import BookSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingListSerializer
+from library_service_api.renderers import ORJSONRenderer, orjson
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+
+
+class Command(BaseCommand):
+    """Compare ORJSONRenderer with DRF's JSONRenderer on serializer output"""
+
+    help = "Benchmark JSON rendering of book, borrowing and payment lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        if orjson is None:
+            self.stderr.write("orjson is not installed; ORJSONRenderer falls back to DRF's renderer.")
+
+        with transaction.atomic():
+            # Everything generated here is rolled back at the end.
+            user = self.generate(options["rows"])
+            payloads = {
+                "books": BookSerializer(
+                    Book.objects.filter(author="benchmark"), many=True
+                ).data,
+                "borrowings": BorrowingListSerializer(
+                    Borrowing.objects.filter(user=user).select_related("user", "book"), many=True
+                ).data,
+                "payments": PaymentSerializer(
+                    Payment.objects.filter(borrowing__user=user), many=True
+                ).data,
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'payload':>12}{'rows':>8}{'json ms':>10}{'orjson ms':>11}{'speedup':>10}")
+        for name, data in payloads.items():
+            if JSONRenderer().render(data) != ORJSONRenderer().render(data):
+                self.stderr.write(f"{name}: renderers disagree")
+            slow_ms = self.measure(lambda: JSONRenderer().render(data), options["repeat"])
+            fast_ms = self.measure(lambda: ORJSONRenderer().render(data), options["repeat"])
+            self.stdout.write(
+                f"{name:>12}{len(data):>8}{slow_ms:>10.1f}{fast_ms:>11.1f}{slow_ms / fast_ms:>9.1f}x"
+            )
+
+    def generate(self, count: int):
+        user = get_user_model().objects.create_user(
+            email="renderer-benchmark@example.com",
+            password=None,
+            first_name="Bench",
+            last_name="Mark"
+        )
+        books = Book.objects.bulk_create([
+            Book(title=f"Benchmark book {index}", author="benchmark",
+                 cover=Book.Cover.SOFT, inventory=1, daily_fee="1.25")
+            for index in range(count)
+        ])
+        now = timezone.now()
+        borrowings = Borrowing.objects.bulk_create([
+            Borrowing(
+                user=user,
+                book=book,
+                borrow_date=now - timedelta(seconds=index),
+                expected_return_date=now + timedelta(days=14),
+                actual_return_date=now if index % 3 == 0 else None
+            )
+            for index, book in enumerate(books)
+        ])
+        Payment.objects.bulk_create([
+            Payment(
+                borrowing=borrowing,
+                status=Payment.Status.PENDING,
+                type=Payment.Type.PAYMENT,
+                session_url="https://checkout.stripe.com/c/pay/benchmark",
+                session_id=f"cs_benchmark_{borrowing.id}",
+                money_to_pay="17.50"
+            )
+            for borrowing in borrowings
+        ])
+        return user
+
+    @staticmethod
+    def measure(run, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,85 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingListSerializer
+from borrowings.views import BorrowingViewSet
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """Compare the values() fast path with BorrowingListSerializer"""
+
+    help = "Benchmark borrowing list serialization at several result sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options) -> None:
+        sizes = sorted(options["rows"])
+        with transaction.atomic():
+            # Everything generated here is rolled back at the end.
+            user = self.generate(sizes[-1])
+            queryset = Borrowing.objects.filter(user=user).order_by("id")
+            fast = BorrowingViewSet.values_serializer
+
+            self.stdout.write(f"{'rows':>8}{'serializer ms':>16}{'fast path ms':>15}{'speedup':>10}")
+            for size in sizes:
+                slow_ms = self.measure(
+                    lambda: BorrowingListSerializer(
+                        queryset.select_related("user", "book")[:size], many=True
+                    ).data,
+                    options["repeat"]
+                )
+                fast_ms = self.measure(
+                    lambda: fast.serialize(fast.fetch(queryset[:size])),
+                    options["repeat"]
+                )
+                self.stdout.write(
+                    f"{size:>8}{slow_ms:>16.1f}{fast_ms:>15.1f}{slow_ms / fast_ms:>9.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    def generate(self, count: int):
+        user = get_user_model().objects.create_user(
+            email="serializer-benchmark@example.com",
+            password=None,
+            first_name="Bench",
+            last_name="Mark"
+        )
+        books = Book.objects.bulk_create([
+            Book(title=f"Benchmark book {index}", author="benchmark",
+                 cover=Book.Cover.SOFT, inventory=1, daily_fee=1)
+            for index in range(100)
+        ])
+        now = timezone.now()
+        for start in range(0, count, BATCH_SIZE):
+            Borrowing.objects.bulk_create([
+                Borrowing(
+                    user=user,
+                    book=books[index % len(books)],
+                    borrow_date=now - timedelta(seconds=index),
+                    expected_return_date=now + timedelta(days=14),
+                    actual_return_date=now if index % 3 == 0 else None
+                )
+                for index in range(start, min(start + BATCH_SIZE, count))
+            ])
+        return user
+
+    @staticmethod
+    def measure(run, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+
+def hot_queries() -> dict:
+    """
+    The access paths the borrowing and payment indexes are built for,
+    with the index each one must use.
+    """
+    user_id = Borrowing.objects.values_list("user_id", flat=True).first() or 0
+    return {
+        "active borrowings per user": (
+            Borrowing.objects.filter(
+                user_id=user_id, actual_return_date__isnull=True
+            ).order_by(),
+            "borrowing_active_user_idx"
+        ),
+        "overdue scan": (
+            Borrowing.objects.filter(
+                actual_return_date__isnull=True, expected_return_date__lte=timezone.now()
+            ).order_by(),
+            "borrowing_overdue_idx"
+        ),
+        "pending fines": (
+            Payment.objects.filter(
+                type=Payment.Type.FINE, status=Payment.Status.PENDING
+            ).order_by("id"),
+            "payment_pending_idx"
+        ),
+        "payment by session id": (
+            Payment.objects.filter(session_id="cs_plan_check"),
+            "payment_session_id_idx"
+        ),
+    }
+
+
+def used_indexes(plan: dict) -> list[str]:
+    found = []
+    if "Index Name" in plan:
+        found.append(plan["Index Name"])
+    for child in plan.get("Plans", ()):
+        found.extend(used_indexes(child))
+    return found
+
+
+class Command(BaseCommand):
+    """Django command to check that hot queries are served by indexes"""
+
+    help = "EXPLAIN ANALYZE the hot borrowing and payment queries and fail unless they use their indexes."
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be checked on PostgreSQL.")
+
+        failures = []
+        for name, (queryset, index) in hot_queries().items():
+            with transaction.atomic():
+                # Small tables are cheaper to scan. With scans ruled out the
+                # planner may still pick another index, so the index used is
+                # checked by name.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                explain = json.loads(queryset.explain(analyze=True, format="json"))
+            plan = explain[0]["Plan"]
+            indexes = used_indexes(plan)
+            self.stdout.write(
+                f"{name}: {plan['Node Type']} using {', '.join(indexes) or 'no index'}, "
+                f"{explain[0]['Execution Time']:.2f} ms"
+            )
+            if index not in indexes:
+                failures.append(f"{name} (expected {index})")
+
+        if failures:
+            raise CommandError(f"Hot queries not using their index: {', '.join(failures)}.")
+        self.stdout.write(self.style.SUCCESS("All hot queries use indexes."))
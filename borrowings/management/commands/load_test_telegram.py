@@ -0,0 +1,95 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from borrowings.telegram_client import TelegramClient, TelegramRateLimited
+
+
+class StubBotHandler(BaseHTTPRequestHandler):
+    """Answers sendMessage like the Bot API, with optional flood control."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+        if random.random() < server.flood_rate:
+            status, body = 429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}
+        else:
+            time.sleep(server.latency)
+            status, body = 200, {"ok": True, "result": {"message_id": server.requests}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """Push messages through the Telegram client against a local stub bot server"""
+
+    help = "Load-test Telegram delivery against a stub Bot API server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=5000)
+        parser.add_argument("--chats", type=int, default=50)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--global-rate", type=float, default=100,
+                            help="Messages per second across all chats.")
+        parser.add_argument("--chat-rate", type=float, default=1,
+                            help="Messages per second per chat.")
+        parser.add_argument("--latency", type=float, default=0.02,
+                            help="Seconds the stub takes per message.")
+        parser.add_argument("--flood-rate", type=float, default=0.0,
+                            help="Share of requests the stub answers with 429.")
+
+    def handle(self, *args, **options) -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubBotHandler)
+        server.lock = threading.Lock()
+        server.requests = 0
+        server.connections = set()
+        server.latency = options["latency"]
+        server.flood_rate = options["flood_rate"]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        client = TelegramClient(
+            "stub",
+            api_url=f"http://127.0.0.1:{server.server_port}",
+            global_rate=options["global_rate"],
+            chat_rate=options["chat_rate"]
+        )
+        results = {"sent": 0, "rate_limited": 0}
+        results_lock = threading.Lock()
+
+        def send(index):
+            try:
+                client.send_message(index % options["chats"], f"Load test message {index}")
+                outcome = "sent"
+            except TelegramRateLimited:
+                outcome = "rate_limited"
+            with results_lock:
+                results[outcome] += 1
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            list(pool.map(send, range(options["messages"])))
+        seconds = time.monotonic() - started
+        server.shutdown()
+
+        self.stdout.write(
+            f"{results['sent']} sent, {results['rate_limited']} rate limited "
+            f"in {seconds:.1f}s ({results['sent'] / seconds * 60:.0f} messages/min) "
+            f"over {len(server.connections)} connections"
+        )
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+from library_service_api.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so writes to large tables are not blocked.
+    atomic = False
+
+    dependencies = [
+        ("books", "0004_book_search_indexes"),
+        ("borrowings", "0004_outboxmessage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", True)),
+                fields=["user"],
+                name="borrowing_active_user_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", True)),
+                fields=["expected_return_date"],
+                name="borrowing_overdue_idx",
+            ),
+        ),
+    ]
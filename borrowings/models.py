@@ -21,6 +21,18 @@ class Borrowing(models.Model):
                 name="unique_borrowing_dates"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["user"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_user_idx"
+            ),
+            models.Index(
+                fields=["expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_overdue_idx"
+            ),
+        ]
         ordering = ["id"]
 
     @staticmethod
@@ -43,3 +55,35 @@ class Borrowing(models.Model):
 
     def __str__(self):
         return f"Borrowing by {self.user} for {self.book} on {self.borrow_date}"
+
+
+class OutboxMessage(models.Model):
+    class Kind(models.TextChoices):
+        PAYMENT_SESSION = "PaymentSession"
+        TELEGRAM = "Telegram"
+
+    class Status(models.TextChoices):
+        PENDING = "Pending"
+        SENT = "Sent"
+        FAILED = "Failed"
+
+    kind = models.CharField(choices=Kind.choices, max_length=14)
+    payload = models.JSONField()
+    status = models.CharField(choices=Status.choices, max_length=7, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx")
+        ]
+        ordering = ["id"]
+
+    @property
+    def idempotency_key(self):
+        return f"outbox-{self.id}"
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
@@ -0,0 +1,222 @@
+"""
+Transactional outbox for the side effects of a borrowing.
+
+Side effects are stored as ``OutboxMessage`` rows in the same transaction
+as the data that caused them and delivered by Celery once it commits, so
+API requests never wait on Stripe or Telegram.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import requests
+from django.db import transaction
+from django.utils import timezone
+
+from borrowings.models import Borrowing, OutboxMessage
+from borrowings.telegram_client import TelegramRateLimited
+from borrowings.telegram_helper import TELEGRAM_MESSAGE_LIMIT, send_telegram_message
+from payments.utils import (
+    create_batch_payment_session,
+    create_stripe_payment_session,
+    session_expires_at,
+)
+
+MAX_ATTEMPTS = 10
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 60 * 60
+LEASE_SECONDS = 5 * 60
+# Stop waiting on rate limits well before the lease ends, or another
+# worker could claim the messages again and send them twice.
+SEND_DEADLINE_SECONDS = LEASE_SECONDS - 60
+
+
+def enqueue(kind: str, payload: dict) -> OutboxMessage:
+    from borrowings.tasks import process_outbox
+
+    message = OutboxMessage.objects.create(kind=kind, payload=payload)
+    transaction.on_commit(process_outbox.delay, robust=True)
+    return message
+
+
+def enqueue_payment_session(
+        borrowing: Borrowing,
+        current_request,
+        payment_type: str = "Payment",
+        total_price: Decimal = Decimal(0)
+) -> OutboxMessage:
+    return enqueue(
+        OutboxMessage.Kind.PAYMENT_SESSION,
+        {
+            "borrowing_id": borrowing.id,
+            "payment_type": payment_type,
+            "total_price": str(total_price),
+            "base_url": current_request.build_absolute_uri("/"),
+            "expires_at": session_expires_at(),
+        }
+    )
+
+
+def enqueue_batch_payment_session(batch_id, current_request) -> OutboxMessage:
+    return enqueue(
+        OutboxMessage.Kind.PAYMENT_SESSION,
+        {
+            "batch_id": str(batch_id),
+            "base_url": current_request.build_absolute_uri("/"),
+            "expires_at": session_expires_at(),
+        }
+    )
+
+
+def enqueue_telegram_message(text: str) -> OutboxMessage:
+    return enqueue(OutboxMessage.Kind.TELEGRAM, {"text": text})
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(
+        seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    )
+
+
+def claim_due_messages(batch_size: int) -> list[OutboxMessage]:
+    """
+    Lease a batch of due messages so concurrent workers skip them. A
+    worker that dies mid-batch leaves its lease to expire, after which
+    the messages are picked up again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxMessage.Status.PENDING,
+                next_attempt_at__lte=now
+            )[:batch_size]
+        )
+        OutboxMessage.objects.filter(id__in=[message.id for message in messages]).update(
+            next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    return messages
+
+
+def deliver(message: OutboxMessage, max_wait: float = None) -> None:
+    payload = message.payload
+    if message.kind == OutboxMessage.Kind.PAYMENT_SESSION and "batch_id" in payload:
+        create_batch_payment_session(
+            payload["batch_id"],
+            base_url=payload["base_url"],
+            idempotency_key=message.idempotency_key,
+            expires_at=payload.get("expires_at")
+        )
+    elif message.kind == OutboxMessage.Kind.PAYMENT_SESSION:
+        borrowing = Borrowing.objects.select_related("book").get(id=payload["borrowing_id"])
+        create_stripe_payment_session(
+            borrowing,
+            current_request=None,
+            payment_type=payload["payment_type"],
+            total_price=Decimal(payload["total_price"]),
+            base_url=payload["base_url"],
+            idempotency_key=message.idempotency_key,
+            expires_at=payload.get("expires_at")
+        )
+    elif message.kind == OutboxMessage.Kind.TELEGRAM:
+        send_telegram_message(payload["text"], raise_errors=True, max_wait=max_wait)
+    else:
+        raise ValueError(f"Unknown outbox message kind: {message.kind}")
+
+
+def record_outcome(message: OutboxMessage, error: Exception = None) -> bool:
+    """Mark a message sent, or schedule its retry. Returns True on success."""
+    if isinstance(error, TelegramRateLimited):
+        # Flood control is not the message's fault, so it costs no attempt.
+        message.last_error = repr(error)
+        message.next_attempt_at = timezone.now() + timedelta(seconds=error.retry_after)
+        message.save(update_fields=["last_error", "next_attempt_at"])
+        return False
+
+    message.attempts += 1
+    if error is not None:
+        message.last_error = repr(error)
+        if message.attempts >= MAX_ATTEMPTS:
+            message.status = OutboxMessage.Status.FAILED
+        else:
+            message.next_attempt_at = timezone.now() + backoff(message.attempts)
+        message.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+        return False
+
+    message.status = OutboxMessage.Status.SENT
+    message.last_error = ""
+    message.save(update_fields=["attempts", "last_error", "status"])
+    return True
+
+
+def process_message(message: OutboxMessage, max_wait: float = None) -> bool:
+    """Deliver a single message, recording the outcome. Returns True on success."""
+    try:
+        deliver(message, max_wait)
+    except Exception as e:
+        return record_outcome(message, e)
+    return record_outcome(message)
+
+
+def group_telegram_messages(
+        messages: list[OutboxMessage],
+        limit: int = TELEGRAM_MESSAGE_LIMIT
+) -> list[list[OutboxMessage]]:
+    """Pack consecutive messages into groups whose joined text fits one Telegram message."""
+    groups = []
+    length = 0
+    for message in messages:
+        size = len(message.payload["text"])
+        if groups and length + 2 + size <= limit:
+            groups[-1].append(message)
+            length += 2 + size
+        else:
+            groups.append([message])
+            length = size
+    return groups
+
+
+def is_bad_request(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.exceptions.HTTPError) and getattr(
+        response, "status_code", None
+    ) == 400
+
+
+def process_messages(messages: list[OutboxMessage]) -> tuple[int, int]:
+    """
+    Deliver a claimed batch. Telegram messages are sent as digests, one
+    request per group, and share the outcome of that request. A digest
+    Telegram rejects as malformed is retried message by message, so one
+    bad message cannot fail the others. Rate limit waits end before the
+    lease does; messages still waiting then are rescheduled.
+    Returns the number of delivered and failed messages.
+    """
+    deadline = time.monotonic() + SEND_DEADLINE_SECONDS
+
+    def remaining() -> float:
+        return max(deadline - time.monotonic(), 0)
+
+    outcomes = []
+    telegram = [message for message in messages if message.kind == OutboxMessage.Kind.TELEGRAM]
+    for message in messages:
+        if message.kind != OutboxMessage.Kind.TELEGRAM:
+            outcomes.append(process_message(message))
+
+    for group in group_telegram_messages(telegram):
+        error = None
+        try:
+            send_telegram_message(
+                "\n\n".join(message.payload["text"] for message in group),
+                raise_errors=True,
+                max_wait=remaining()
+            )
+        except Exception as e:
+            error = e
+        if len(group) > 1 and is_bad_request(error):
+            outcomes.extend(process_message(message, remaining()) for message in group)
+        else:
+            outcomes.extend(record_outcome(message, error) for message in group)
+
+    delivered = sum(outcomes)
+    return delivered, len(outcomes) - delivered
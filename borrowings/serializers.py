@@ -1,8 +1,19 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
 from borrowings.models import Borrowing
+from books.inventory import reserve_copies, reserve_copy
+from books.models import Book
 from books.serializers import BookSerializer
-from borrowings.telegram_helper import send_borrowing_notification
+from borrowings.outbox import enqueue_telegram_message
+from borrowings.telegram_helper import (
+    batch_borrowing_notification_message,
+    borrowing_notification_message
+)
+from library_service_api.change_markers import touch_on_commit
 from payments.serializers import PaymentSerializer
 
 
@@ -17,21 +28,83 @@ class BorrowingSerializer(serializers.ModelSerializer):
         )
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         book = validated_data["book"]
-        book.inventory -= 1
-        book.save()
+        if not reserve_copy(book.id):
+            Borrowing.validate_borrowing(0)
 
         borrowing = Borrowing.objects.create(
             user=self.context["request"].user,
             book=book,
             expected_return_date=validated_data["expected_return_date"]
         )
-        send_borrowing_notification(borrowing=borrowing)
+        enqueue_telegram_message(borrowing_notification_message(borrowing))
 
         return borrowing
 
 
+MAX_BATCH_SIZE = 20
+
+
+def validate_unique_ids(ids: list[int]) -> list[int]:
+    if len(set(ids)) != len(ids):
+        raise serializers.ValidationError("Each ID may appear only once.")
+    return ids
+
+
+class BatchBorrowingSerializer(serializers.Serializer):
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=MAX_BATCH_SIZE
+    )
+    expected_return_date = serializers.DateTimeField()
+
+    def validate_books(self, book_ids):
+        validate_unique_ids(book_ids)
+        books = Book.objects.in_bulk(book_ids)
+        missing = [book_id for book_id in book_ids if book_id not in books]
+        if missing:
+            raise serializers.ValidationError(f"Books not found: {missing}.")
+        return [books[book_id] for book_id in book_ids]
+
+    @transaction.atomic
+    def create(self, validated_data):
+        books = validated_data["books"]
+        out_of_stock = reserve_copies([book.id for book in books])
+        if out_of_stock:
+            raise serializers.ValidationError(
+                {"inventory": f"Books out of stock: {out_of_stock}."}
+            )
+
+        now = timezone.now()
+        # Distinct borrow dates keep the batch clear of unique_borrowing_dates
+        # once it is returned in one go.
+        borrowings = Borrowing.objects.bulk_create([
+            Borrowing(
+                user=self.context["request"].user,
+                book=book,
+                borrow_date=now + timedelta(microseconds=position),
+                expected_return_date=validated_data["expected_return_date"]
+            )
+            for position, book in enumerate(books)
+        ])
+        touch_on_commit("borrowings")
+        enqueue_telegram_message(batch_borrowing_notification_message(borrowings))
+
+        return borrowings
+
+
+class BatchReturnSerializer(serializers.Serializer):
+    borrowings = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        validators=[validate_unique_ids]
+    )
+
+
 class BorrowingListSerializer(serializers.ModelSerializer):
     book = serializers.CharField(
         source="book.title",
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from borrowings.models import Borrowing
+from library_service_api.change_markers import touch_on_commit
+
+
+@receiver(post_save, sender=Borrowing)
+@receiver(post_delete, sender=Borrowing)
+def touch_borrowings_on_change(sender, **kwargs):
+    touch_on_commit("borrowings")
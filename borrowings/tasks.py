@@ -1,55 +1,116 @@
+import logging
+import time
 import stripe
 from celery import shared_task
 from django.utils import timezone
+from borrowings.fines import charge_fines
 from borrowings.models import Borrowing
-from borrowings.telegram_helper import send_telegram_message
-from payments.models import Payment
-from payments.utils import create_stripe_payment_session
+from borrowings.outbox import claim_due_messages, process_messages
+from borrowings.telegram_helper import build_digests, send_telegram_message
+from library_service_api.metrics import observe_external_call
+from payments.webhooks import apply_checkout_sessions
 
-FINE_MULTIPLAYER = 2
+logger = logging.getLogger(__name__)
+
+OVERDUE_CHUNK_SIZE = 2000
+# The scan holds no lease, so it waits out rate limits instead of dropping digests.
+OVERDUE_MAX_WAIT = float("inf")
+OUTBOX_BATCH_SIZE = 100
+RECONCILIATION_WINDOW = timezone.timedelta(days=2)
+RECONCILIATION_BATCH_SIZE = 500
+
+
+def overdue_entry(borrowing_id, title, email, expected_return_date) -> str:
+    """Plain text; ``build_digests`` escapes it."""
+    return (
+        f"Book: {title}\n"
+        f"User: {email}\n"
+        f"Expected Return Date: {expected_return_date}\n"
+        f"Borrowing ID: {borrowing_id}"
+    )
 
 
 @shared_task
 def check_overdue_borrowings():
+    """
+    Stream overdue borrowings through one joined query and send them as
+    digests instead of one message per borrowing.
+    """
+    started = time.monotonic()
     tomorrow = timezone.now() + timezone.timedelta(days=1)
-    overdue_borrowings = Borrowing.objects.filter(
+    rows = Borrowing.objects.filter(
         expected_return_date__lte=tomorrow,
         actual_return_date__isnull=True
+    ).order_by("expected_return_date", "id").values_list(
+        "id", "book__title", "user__email", "expected_return_date"
+    ).iterator(chunk_size=OVERDUE_CHUNK_SIZE)
+    summary = {"scanned": 0, "messages": 0}
+
+    def entries():
+        for row in rows:
+            summary["scanned"] += 1
+            yield overdue_entry(*row)
+
+    for digest in build_digests(entries(), header="📚 Overdue Borrowing Alert!"):
+        send_telegram_message(digest, max_wait=OVERDUE_MAX_WAIT)
+        summary["messages"] += 1
+
+    if not summary["scanned"]:
+        send_telegram_message("🚫 No borrowings overdue today!", max_wait=OVERDUE_MAX_WAIT)
+        summary["messages"] += 1
+
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    logger.info(
+        "Overdue scan: %(scanned)s rows, %(messages)s messages in %(seconds)ss",
+        summary
     )
-    if overdue_borrowings.exists():
-        for borrowing in overdue_borrowings:
-            message = (
-                f"📚 Overdue Borrowing Alert!\n"
-                f"Book: {borrowing.book.title}\n"
-                f"User: {borrowing.user.username}\n"
-                f"Expected Return Date: {borrowing.expected_return_date}\n"
-                f"Borrowing ID: {borrowing.id}\n"
-            )
-            send_telegram_message(message)
-    else:
-        send_telegram_message("🚫 No borrowings overdue today!")
+    return summary
+
+
+def finished_checkout_sessions(stripe_status: str, created_after: int):
+    with observe_external_call("stripe", "checkout_session_list"):
+        sessions = stripe.checkout.Session.list(
+            created={"gte": created_after},
+            status=stripe_status,
+            limit=100
+        )
+    batch = []
+    for session in sessions.auto_paging_iter():
+        if stripe_status == "expired" or session["payment_status"] == "paid":
+            batch.append(session["id"])
+        if len(batch) == RECONCILIATION_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 @shared_task
 def check_expired_sessions():
-    now = timezone.now()
-    pending_payments = Payment.objects.filter(status="Pending")
-    for payment in pending_payments:
-        session = stripe.checkout.Session.retrieve(payment.session_id)
-        if session["status"] == "expired" or session["expires_at"] < now.timestamp():
-            payment.status = "Expired"
-            payment.save()
+    """
+    Reconciliation sweep for webhook events that never arrived. Pages
+    through the sessions Stripe finished within the window instead of
+    retrieving every pending payment, and applies them in batches.
+    """
+    created_after = int((timezone.now() - RECONCILIATION_WINDOW).timestamp())
+    summary = {"paid": 0, "expired": 0}
+    for session_ids in finished_checkout_sessions("complete", created_after):
+        summary["paid"] += apply_checkout_sessions(paid_session_ids=session_ids)["paid"]
+    for session_ids in finished_checkout_sessions("expired", created_after):
+        summary["expired"] += apply_checkout_sessions(expired_session_ids=session_ids)["expired"]
+    return summary
 
 
 @shared_task
 def calculate_fines():
-    today = timezone.now()
-    borrowings = Borrowing.objects.filter(
-        actual_return_date__isnull=True,
-        expected_return_date=today
-    )
-    for borrowing in borrowings:
-        days_overdue = (today - borrowing.expected_return_date).days
-        if days_overdue > 0:
-            fine_amount = days_overdue * borrowing.book.daily_fee * FINE_MULTIPLAYER
-            create_stripe_payment_session(borrowing, current_request=None, payment_type="Fine", total_price=fine_amount)
+    return charge_fines(timezone.localdate())
+
+
+@shared_task
+def process_outbox():
+    delivered = failed = 0
+    while messages := claim_due_messages(OUTBOX_BATCH_SIZE):
+        batch_delivered, batch_failed = process_messages(messages)
+        delivered += batch_delivered
+        failed += batch_failed
+    return {"delivered": delivered, "failed": failed}
@@ -0,0 +1,132 @@
+"""
+Telegram Bot API client for the notification workers.
+
+One client per process keeps a pool of keep-alive connections and paces
+requests with token buckets, one shared by all chats and one per chat,
+so bursts stay under Telegram's flood limits instead of earning 429s.
+The buckets live in the shared cache, since Telegram enforces its limits
+per bot, across every worker sending for it.
+"""
+import hashlib
+import math
+import threading
+import time
+
+import requests
+from django.core.cache import cache as default_cache
+from requests.adapters import HTTPAdapter
+
+from library_service_api.metrics import observe_external_call
+from library_service_api.throttling import gcra, gcra_block
+
+POOL_SIZE = 16
+
+
+class TelegramRateLimited(requests.exceptions.HTTPError):
+    def __init__(self, retry_after: int, *args, **kwargs):
+        super().__init__(f"Rate limited by Telegram, retry after {retry_after}s", *args, **kwargs)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every process through the cache, kept as GCRA
+    state. ``acquire`` blocks until a token is free, but for no longer
+    than ``max_wait`` seconds, raising ``TelegramRateLimited`` instead.
+    """
+
+    def __init__(self, key: str, rate: float, capacity: float = 1, cache=None, sleep=time.sleep):
+        self.key = f"telegram-bucket:{key}"
+        self.num_requests = capacity
+        self.duration = capacity / rate
+        self.cache = cache or default_cache
+        self.sleep = sleep
+
+    def acquire(self, max_wait: float = math.inf) -> None:
+        waited = 0.0
+        while True:
+            allowed, wait = gcra(self.cache, self.key, self.num_requests, self.duration)
+            if allowed:
+                return
+            if waited + wait > max_wait:
+                raise TelegramRateLimited(math.ceil(wait))
+            self.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next ``seconds``."""
+        gcra_block(self.cache, self.key, seconds, self.num_requests, self.duration)
+
+
+class TelegramClient:
+    def __init__(
+            self,
+            token: str,
+            api_url: str = "https://api.telegram.org",
+            timeout: float = 10,
+            global_rate: float = 30,
+            chat_rate: float = 1,
+            max_wait: float = 60,
+            session: requests.Session = None
+    ):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.timeout = timeout
+        self.chat_rate = chat_rate
+        self.max_wait = max_wait
+        # Limits are per bot; the key names the bot without exposing its token.
+        self.bot_key = hashlib.sha256(str(token).encode()).hexdigest()[:16]
+        self.global_bucket = TokenBucket(
+            f"{self.bot_key}:global", global_rate, capacity=max(global_rate, 1)
+        )
+        self.chat_buckets = {}
+        self.chat_buckets_lock = threading.Lock()
+        self.session = session or self.build_session()
+
+    @staticmethod
+    def build_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def chat_bucket(self, chat_id) -> TokenBucket:
+        with self.chat_buckets_lock:
+            if chat_id not in self.chat_buckets:
+                self.chat_buckets[chat_id] = TokenBucket(
+                    f"{self.bot_key}:chat:{chat_id}", self.chat_rate
+                )
+            return self.chat_buckets[chat_id]
+
+    def send_message(
+            self,
+            chat_id,
+            text: str,
+            parse_mode: str = "HTML",
+            max_wait: float = None
+    ) -> dict:
+        """
+        Send one message, waiting for both buckets for at most ``max_wait``
+        seconds in total (the client's default when ``None``).
+        """
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        chat_bucket = self.chat_bucket(chat_id)
+        # Wait for the chat first, so a slow chat does not hold global tokens.
+        chat_bucket.acquire(max(deadline - time.monotonic(), 0))
+        self.global_bucket.acquire(max(deadline - time.monotonic(), 0))
+
+        with observe_external_call("telegram", "send_message"):
+            response = self.session.post(
+                self.url,
+                data={"chat_id": chat_id, "text": text, "parse_mode": parse_mode},
+                timeout=self.timeout
+            )
+        if response.status_code == 429:
+            try:
+                retry_after = response.json()["parameters"]["retry_after"]
+            except (ValueError, KeyError, TypeError):
+                retry_after = 1
+            chat_bucket.pause(retry_after)
+            raise TelegramRateLimited(retry_after, response=response)
+        response.raise_for_status()
+        return response.json()
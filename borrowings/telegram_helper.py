@@ -1,49 +1,114 @@
+import logging
 import os
+from functools import lru_cache
+from html import escape
+from typing import Iterable, Iterator
+
 import requests
+from django.conf import settings
 from dotenv import load_dotenv
 
 from borrowings.models import Borrowing
+from borrowings.telegram_client import TelegramClient
 from payments.models import Payment
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_TIMEOUT = 10
+TELEGRAM_MESSAGE_LIMIT = 4096
 
 
-def send_telegram_message(message: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": message,
-        "parse_mode": "HTML"
-    }
+@lru_cache(maxsize=None)
+def get_telegram_client() -> TelegramClient:
+    """The process-wide client, so connections and rate limits are shared."""
+    return TelegramClient(
+        TELEGRAM_BOT_TOKEN,
+        api_url=settings.TELEGRAM_API_URL,
+        timeout=TELEGRAM_TIMEOUT,
+        global_rate=settings.TELEGRAM_GLOBAL_RATE,
+        chat_rate=settings.TELEGRAM_CHAT_RATE
+    )
+
 
+def send_telegram_message(message: str, raise_errors: bool = False, max_wait: float = None):
     try:
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
+        get_telegram_client().send_message(TELEGRAM_CHAT_ID, message, max_wait=max_wait)
     except requests.exceptions.RequestException as e:
-        print(f"Failed to send message: {e}")
+        if raise_errors:
+            raise
+        logger.warning("Failed to send Telegram message: %s", e)
+
+
+def build_digests(
+        entries: Iterable[str],
+        header: str = "",
+        limit: int = TELEGRAM_MESSAGE_LIMIT
+) -> Iterator[str]:
+    """
+    Pack entries into as few messages as possible, each one starting with
+    the header and fitting into Telegram's message length limit. Entries
+    are consumed lazily, so the whole input never has to be in memory.
+
+    Entries and header are plain text and digests come out HTML-escaped.
+    Telegram applies the limit after parsing entities, so lengths are
+    measured, and oversized entries truncated, before escaping; a cut can
+    never split an entity.
+    """
+    digest = header
+    for entry in entries:
+        candidate = f"{digest}\n\n{entry}" if digest else entry
+        if len(candidate) <= limit:
+            digest = candidate
+            continue
+        if digest != header:
+            yield escape(digest)
+        digest = (f"{header}\n\n{entry}" if header else entry)[:limit]
+    if digest != header:
+        yield escape(digest)
 
 
-def send_borrowing_notification(borrowing: Borrowing):
-    message = (
+def borrowing_notification_message(borrowing: Borrowing) -> str:
+    return (
         f"📚 New Borrowing Created:\n"
-        f"User: {borrowing.user.full_name}\n"
-        f"Book: {borrowing.book.title}\n"
+        f"User: {escape(borrowing.user.full_name)}\n"
+        f"Book: {escape(borrowing.book.title)}\n"
         f"Borrow Date: {borrowing.borrow_date}\n"
-        f"Expected Return Date: {borrowing.expected_return_date}"
+        f"Expected Return Date: {borrowing.expected_return_date}\n"
         f"Actual Return Date: {borrowing.actual_return_date}"
     )
-    send_telegram_message(message)
 
 
-def payment_is_paid_notification(payment: Payment):
-    message = (
-        f"Payment by {payment.borrowing.user.full_name} is paid!\n"
-        f"Book: {payment.borrowing.book.title}\n"
+def payment_notification_message(payment: Payment) -> str:
+    return (
+        f"Payment by {escape(payment.borrowing.user.full_name)} is paid!\n"
+        f"Book: {escape(payment.borrowing.book.title)}\n"
         f"Borrow Date: {payment.borrowing.borrow_date}\n"
-        f"Expected Return Date: {payment.borrowing.expected_return_date}"
+        f"Expected Return Date: {payment.borrowing.expected_return_date}\n"
         f"Actual Return Date: {payment.borrowing.actual_return_date}"
     )
-    send_telegram_message(message)
+
+
+def batch_borrowing_notification_message(borrowings: list[Borrowing]) -> str:
+    first = borrowings[0]
+    books = "\n".join(f"- {escape(borrowing.book.title)}" for borrowing in borrowings)
+    return (
+        f"📚 {len(borrowings)} New Borrowings Created:\n"
+        f"User: {escape(first.user.full_name)}\n"
+        f"Books:\n{books}\n"
+        f"Borrow Date: {first.borrow_date}\n"
+        f"Expected Return Date: {first.expected_return_date}"
+    )
+
+
+def batch_payment_notification_message(payments: list[Payment]) -> str:
+    first = payments[0]
+    books = "\n".join(f"- {escape(payment.borrowing.book.title)}" for payment in payments)
+    return (
+        f"Payment by {escape(first.borrowing.user.full_name)} for {len(payments)} books is paid!\n"
+        f"Books:\n{books}\n"
+        f"Total: {sum(payment.money_to_pay for payment in payments)}"
+    )
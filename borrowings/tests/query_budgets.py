@@ -0,0 +1,10 @@
+# Queries per request or task, counted in tests (savepoints included).
+QUERY_BUDGETS = {
+    "borrowing-list": 2,
+    "borrowing-retrieve": 2,
+    "borrowing-create": 9,
+    "borrowing-return_borrowing": 5,
+    "borrowing-batch_create": 10,
+    "borrowing-batch_return": 6,
+    "borrowings.tasks.check_overdue_borrowings": 1,
+}
@@ -0,0 +1,258 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import sample_book
+from borrowings.models import Borrowing, OutboxMessage
+from borrowings.outbox import process_message
+from borrowings.serializers import MAX_BATCH_SIZE
+from borrowings.tests.test_borrowings_api import BORROWING_URL, sample_borrowing
+from library_service_api.throttling import ScopedGCRAThrottle
+from payments.models import Payment
+from payments.webhooks import apply_checkout_sessions
+
+BATCH_URL = reverse("borrowings:borrowing-batch-create")
+BATCH_RETURN_URL = reverse("borrowings:borrowing-batch-return")
+
+
+def fake_session(session_id="cs_batch"):
+    return SimpleNamespace(id=session_id, url=f"https://checkout.stripe.com/{session_id}")
+
+
+def telegram_messages():
+    return list(
+        OutboxMessage.objects.filter(kind=OutboxMessage.Kind.TELEGRAM).values_list(
+            "payload__text", flat=True
+        )
+    )
+
+
+@override_settings(LAZY_PAYMENT_SESSIONS=True)
+class BatchCheckoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.books = [sample_book(title=f"Batch {index}", inventory=2) for index in range(3)]
+        self.payload = {
+            "books": [book.id for book in self.books],
+            "expected_return_date": timezone.now() + timedelta(days=3),
+        }
+
+    def test_batch_checkout(self):
+        res = self.client.post(BATCH_URL, self.payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["borrowings"]), 3)
+        for book in self.books:
+            book.refresh_from_db()
+            self.assertEqual(book.inventory, 1)
+
+        borrowings = Borrowing.objects.filter(user=self.user)
+        self.assertEqual(sorted(borrowings.values_list("book_id", flat=True)), self.payload["books"])
+        payments = Payment.objects.filter(borrowing__in=borrowings)
+        self.assertEqual(payments.count(), 3)
+        self.assertEqual(len(set(payments.values_list("batch_id", flat=True))), 1)
+        self.assertEqual(set(payments.values_list("session_id", flat=True)), {""})
+
+        messages = telegram_messages()
+        self.assertEqual(len(messages), 1)
+        for book in self.books:
+            self.assertIn(book.title, messages[0])
+
+    def test_batch_is_all_or_nothing(self):
+        sample_book(title="Gone", inventory=0)
+        gone = sample_book(title="Gone too", inventory=0)
+        self.payload["books"].append(gone.id)
+
+        res = self.client.post(BATCH_URL, self.payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(gone.id), str(res.data["inventory"]))
+        self.assertFalse(Borrowing.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+        for book in self.books:
+            book.refresh_from_db()
+            self.assertEqual(book.inventory, 2)
+
+    def test_invalid_book_lists_are_rejected(self):
+        for books in (
+                [],
+                [self.books[0].id, self.books[0].id],
+                [self.books[0].id, 999999],
+                list(range(1, MAX_BATCH_SIZE + 2)),
+        ):
+            res = self.client.post(
+                BATCH_URL, {**self.payload, "books": books}, format="json"
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, books)
+
+        self.assertFalse(Borrowing.objects.exists())
+
+    @patch.object(ScopedGCRAThrottle, "THROTTLE_RATES", {"borrowing_create": "5/hour"})
+    def test_batch_is_throttled_per_book(self):
+        first = self.client.post(BATCH_URL, self.payload, format="json")
+        second = self.client.post(BATCH_URL, self.payload, format="json")
+        single = self.client.post(
+            BORROWING_URL,
+            {"book": self.books[0].id, "expected_return_date": self.payload["expected_return_date"]}
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Three of the five borrowings allowed per hour are used.
+        self.assertEqual(single.status_code, status.HTTP_201_CREATED)
+
+    @patch("stripe.checkout.Session.create_async")
+    def test_batch_is_paid_with_one_session(self, mock_create):
+        mock_create.return_value = fake_session()
+        res = self.client.post(BATCH_URL, self.payload, format="json")
+        payment_id = res.data["payments"][1]["id"]
+
+        pay = self.client.get(reverse("payments:payment-pay", args=(payment_id,)))
+
+        self.assertEqual(pay.status_code, status.HTTP_200_OK)
+        self.assertEqual(pay.data["session_id"], "cs_batch")
+        mock_create.assert_called_once()
+        line_items = mock_create.call_args.kwargs["line_items"]
+        self.assertEqual(
+            [item["price_data"]["product_data"]["name"] for item in line_items],
+            [book.title for book in self.books]
+        )
+        payments = Payment.objects.filter(borrowing__user=self.user)
+        self.assertEqual(set(payments.values_list("session_id", flat=True)), {"cs_batch"})
+
+        OutboxMessage.objects.all().delete()
+        self.assertEqual(apply_checkout_sessions(paid_session_ids=["cs_batch"])["paid"], 3)
+        self.assertEqual(len(telegram_messages()), 1)
+        self.assertEqual(
+            set(payments.values_list("status", flat=True)), {Payment.Status.PAID}
+        )
+
+    @patch("stripe.checkout.Session.create_async")
+    def test_renewing_a_batch_keeps_its_payments(self, mock_create):
+        mock_create.return_value = fake_session("cs_renewed")
+        self.client.post(BATCH_URL, self.payload, format="json")
+        payments = Payment.objects.filter(borrowing__user=self.user)
+        payments.update(session_id="cs_expired", status=Payment.Status.EXPIRED)
+        payment_ids = sorted(payments.values_list("id", flat=True))
+
+        res = self.client.post(
+            reverse("payments:payment-renew"), {"session_id": "cs_expired"}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mock_create.call_args.kwargs["line_items"]), 3)
+        self.assertEqual(sorted(payments.values_list("id", flat=True)), payment_ids)
+        self.assertEqual(
+            set(payments.values_list("session_id", "status")),
+            {("cs_renewed", Payment.Status.PENDING)}
+        )
+
+    @override_settings(LAZY_PAYMENT_SESSIONS=False)
+    @patch("stripe.checkout.Session.create")
+    def test_eager_batch_queues_one_session(self, mock_create):
+        mock_create.return_value = fake_session()
+
+        res = self.client.post(BATCH_URL, self.payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        mock_create.assert_not_called()
+        message = OutboxMessage.objects.get(kind=OutboxMessage.Kind.PAYMENT_SESSION)
+        self.assertEqual(message.payload["batch_id"], str(res.data["payments"][0]["batch_id"]))
+
+        self.assertTrue(process_message(message))
+
+        mock_create.assert_called_once()
+        self.assertEqual(len(mock_create.call_args.kwargs["line_items"]), 3)
+        self.assertEqual(mock_create.call_args.kwargs["idempotency_key"], message.idempotency_key)
+        self.assertEqual(
+            set(Payment.objects.values_list("session_id", flat=True)), {"cs_batch"}
+        )
+
+
+class BatchReturnTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.book = sample_book(title="Returned", inventory=0)
+        self.other_book = sample_book(title="Other", inventory=0)
+        now = timezone.now()
+        self.borrowings = [
+            sample_borrowing(book=book, user=self.user, borrow_date=now - timedelta(minutes=index))
+            for index, book in enumerate((self.book, self.book, self.other_book))
+        ]
+
+    def test_batch_return(self):
+        returned = sample_borrowing(
+            book=self.other_book, user=self.user, actual_return_date=timezone.now()
+        )
+        ids = [borrowing.id for borrowing in self.borrowings] + [returned.id]
+
+        res = self.client.post(BATCH_RETURN_URL, {"borrowings": ids}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["returned"], ids[:3])
+        self.assertEqual(res.data["already_returned"], [returned.id])
+        self.assertFalse(
+            Borrowing.objects.filter(id__in=ids, actual_return_date__isnull=True).exists()
+        )
+        self.book.refresh_from_db()
+        self.other_book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+        self.assertEqual(self.other_book.inventory, 1)
+
+    def test_returning_twice_changes_nothing(self):
+        ids = [borrowing.id for borrowing in self.borrowings]
+        self.client.post(BATCH_RETURN_URL, {"borrowings": ids}, format="json")
+
+        res = self.client.post(BATCH_RETURN_URL, {"borrowings": ids}, format="json")
+
+        self.assertEqual(res.data["returned"], [])
+        self.assertEqual(res.data["already_returned"], ids)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+    def test_other_users_borrowings_are_not_found(self):
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        foreign = sample_borrowing(book=self.book, user=other)
+
+        res = self.client.post(
+            BATCH_RETURN_URL,
+            {"borrowings": [self.borrowings[0].id, foreign.id]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(foreign.id), str(res.data["borrowings"]))
+        self.assertFalse(Borrowing.objects.filter(actual_return_date__isnull=False).exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_batch_created_borrowings_can_be_returned_together(self):
+        books = [sample_book(title=f"Together {index}") for index in range(3)]
+        created = self.client.post(
+            BATCH_URL,
+            {
+                "books": [book.id for book in books],
+                "expected_return_date": timezone.now() + timedelta(days=3),
+            },
+            format="json"
+        )
+        ids = [borrowing["id"] for borrowing in created.data["borrowings"]]
+
+        res = self.client.post(BATCH_RETURN_URL, {"borrowings": ids}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["returned"], ids)
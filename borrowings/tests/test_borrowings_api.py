@@ -135,6 +135,27 @@ class AuthenticatedBorrowingApiTests(TestCase):
         self.assertEqual(res1.status_code, status.HTTP_200_OK)
         self.assertEqual(res2.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_borrowing_return_increments_inventory_once(self):
+        borrowing = sample_borrowing(user=self.user, book=sample_book(inventory=3))
+        url = detail_url(borrowing.id) + "return/"
+
+        self.client.post(url)
+        self.client.post(url)
+
+        borrowing.book.refresh_from_db()
+        self.assertEqual(borrowing.book.inventory, 4)
+
+    def test_return_changes_list_etag(self):
+        borrowing = sample_borrowing(user=self.user)
+        res = self.client.get(BORROWING_URL)
+        res_cached = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.client.post(detail_url(borrowing.id) + "return/")
+        res_returned = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res_cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res_returned.status_code, status.HTTP_200_OK)
+
 
 class AdminBorrowingTest(TestCase):
     def setUp(self):
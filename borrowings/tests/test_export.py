@@ -0,0 +1,131 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from borrowings.tests.test_borrowings_api import sample_borrowing, sample_user
+from payments.tests.test_payments_api import sample_payment
+
+BORROWING_EXPORT_URL = reverse("borrowings:borrowing-export")
+PAYMENT_EXPORT_URL = reverse("payments:payment-export")
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+
+class ExportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="testpass",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.active = sample_borrowing()
+        self.returned = sample_borrowing(actual_return_date=timezone.now())
+
+    def test_export_requires_staff(self):
+        self.client.force_authenticate(sample_user())
+
+        res = self.client.get(BORROWING_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_streams_filtered_borrowings_as_ndjson(self):
+        res = self.client.get(BORROWING_EXPORT_URL, {"is_active": "true"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = read_ndjson(res)
+        self.assertEqual([row["id"] for row in rows], [self.active.id])
+        self.assertEqual(rows[0]["book__title"], self.active.book.title)
+
+    def test_export_as_csv(self):
+        res = self.client.get(BORROWING_EXPORT_URL, {"export_format": "csv"})
+
+        rows = list(csv.DictReader(StringIO(b"".join(res.streaming_content).decode())))
+        self.assertEqual([int(row["id"]) for row in rows], [self.active.id, self.returned.id])
+        self.assertNotEqual(rows[1]["actual_return_date"], "")
+
+    def test_export_is_gzipped_when_accepted(self):
+        res = self.client.get(BORROWING_EXPORT_URL, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(res.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_export_honours_accept_encoding_q_values(self):
+        for accept_encoding, gzipped in (
+                ("gzip;q=0", False),
+                ("deflate, gzip; q=0.0", False),
+                ("*, gzip;q=0", False),
+                ("identity", False),
+                ("gzip;q=0.5", True),
+                ("*", True),
+        ):
+            res = self.client.get(BORROWING_EXPORT_URL, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+            self.assertEqual(res.get("Content-Encoding") == "gzip", gzipped, accept_encoding)
+
+    def test_unknown_export_format(self):
+        res = self.client.get(BORROWING_EXPORT_URL, {"export_format": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_payments(self):
+        payment = sample_payment(self.active)
+
+        rows = read_ndjson(self.client.get(PAYMENT_EXPORT_URL))
+
+        self.assertEqual([row["id"] for row in rows], [payment.id])
+        self.assertEqual(rows[0]["money_to_pay"], "10.00")
+
+
+class AsgiExportTests(TestCase):
+    """Under ASGI the export must be an async iterator, or Django buffers all of it."""
+
+    def setUp(self):
+        admin = get_user_model().objects.create_user(
+            email="admin@test.com",
+            password="testpass",
+            is_staff=True
+        )
+        self.client = AsyncClient()
+        self.headers = {"authorization": f"Bearer {AccessToken.for_user(admin)}"}
+        self.borrowings = [sample_borrowing(), sample_borrowing(actual_return_date=timezone.now())]
+
+    async def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        return b"".join([part async for part in response])
+
+    async def test_export_streams_asynchronously(self):
+        res = await self.client.get(
+            BORROWING_EXPORT_URL, {"export_format": "csv"}, headers=self.headers
+        )
+
+        rows = list(csv.DictReader(StringIO((await self.read(res)).decode())))
+        self.assertEqual(
+            [int(row["id"]) for row in rows], [borrowing.id for borrowing in self.borrowings]
+        )
+
+    async def test_gzipped_export_streams_asynchronously(self):
+        res = await self.client.get(
+            BORROWING_EXPORT_URL, headers={**self.headers, "accept-encoding": "gzip"}
+        )
+
+        lines = gzip.decompress(await self.read(res)).splitlines()
+        self.assertEqual(
+            [json.loads(line)["id"] for line in lines], [borrowing.id for borrowing in self.borrowings]
+        )
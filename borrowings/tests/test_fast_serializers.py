@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import sample_book
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingListSerializer, BorrowingRetrieveSerializer
+from borrowings.views import BorrowingViewSet
+from library_service_api.fast_serializers import ValuesSerializer
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+from payments.tests.test_payments_api import sample_payment
+
+BORROWING_URL = reverse("borrowings:borrowing-list")
+PAYMENT_URL = reverse("payments:payment-list")
+
+
+class ValuesSerializerParityTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="reader@test.com",
+            password="testpass",
+            first_name="Ada",
+            last_name="Lovelace",
+            is_staff=True
+        )
+        now = timezone.now()
+        self.borrowings = [
+            Borrowing.objects.create(
+                book=sample_book(title=f"Book {index}", daily_fee="1.10"),
+                user=self.user,
+                borrow_date=now - timedelta(days=index),
+                expected_return_date=now + timedelta(days=index + 1),
+                actual_return_date=now if index % 2 else None
+            )
+            for index in range(4)
+        ]
+        sample_payment(self.borrowings[0], money_to_pay="12.50")
+        sample_payment(
+            self.borrowings[1],
+            type=Payment.Type.FINE,
+            status=Payment.Status.PAID,
+            session_id="",
+            session_url="",
+            money_to_pay=3,
+            fine_date=date(2024, 1, 2)
+        )
+
+    def test_borrowing_list_parity(self):
+        queryset = Borrowing.objects.select_related("user", "book")
+
+        fast = BorrowingViewSet.values_serializer
+
+        self.assertEqual(
+            fast.serialize(fast.fetch(Borrowing.objects.all())),
+            BorrowingListSerializer(queryset, many=True).data
+        )
+
+    def test_payment_parity(self):
+        fast = ValuesSerializer(PaymentSerializer)
+
+        self.assertEqual(
+            fast.serialize(fast.fetch(Payment.objects.order_by("id"))),
+            PaymentSerializer(Payment.objects.order_by("id"), many=True).data
+        )
+
+    def test_nested_serializers_are_rejected(self):
+        fast = ValuesSerializer(BorrowingRetrieveSerializer)
+
+        with self.assertRaises(ImproperlyConfigured):
+            fast.fetch(Borrowing.objects.all())
+
+    def test_list_endpoints_match_model_serializers(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        requests = (
+            (BORROWING_URL, {"is_active": "true"}),
+            (BORROWING_URL, {"pagination": "cursor", "page_size": 2}),
+            (PAYMENT_URL, {}),
+        )
+
+        for url, params in requests:
+            with self.subTest(url=url, params=params):
+                with override_settings(FAST_LIST_SERIALIZATION=True):
+                    fast = client.get(url, params).json()
+                with override_settings(FAST_LIST_SERIALIZATION=False):
+                    slow = client.get(url, params).json()
+                self.assertEqual(fast, slow)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import stripe
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from books.tests.test_books_api import sample_book
+from borrowings.fines import FINE_MULTIPLAYER, charge_fines, fine_idempotency_key
+from borrowings.tests.test_borrowings_api import sample_borrowing
+from payments.models import FineRun, Payment
+
+
+def fake_session(title, total_price, idempotency_key=None, **kwargs):
+    return SimpleNamespace(id=f"cs_{idempotency_key}", url=f"https://checkout.stripe.com/{idempotency_key}")
+
+
+@override_settings(LAZY_PAYMENT_SESSIONS=False)
+@patch("borrowings.fines.create_checkout_session", side_effect=fake_session)
+class FinesEngineTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.book = sample_book(daily_fee=Decimal("1.50"))
+        self.overdue = sample_borrowing(
+            book=self.book,
+            expected_return_date=timezone.now() - timedelta(days=3)
+        )
+        sample_borrowing(expected_return_date=timezone.now() + timedelta(days=3))
+        sample_borrowing(
+            expected_return_date=timezone.now() - timedelta(days=3),
+            actual_return_date=timezone.now()
+        )
+
+    def test_first_run_charges_one_day_per_overdue_borrowing(self, mock_session):
+        summary = charge_fines(self.today)
+
+        fine = Payment.objects.get(type=Payment.Type.FINE)
+        self.assertEqual(summary["fines"], 1)
+        self.assertEqual(summary["sessions"], 1)
+        self.assertEqual(fine.borrowing, self.overdue)
+        self.assertEqual(fine.money_to_pay, Decimal("1.50") * FINE_MULTIPLAYER)
+        self.assertEqual(fine.session_id, f"cs_{fine_idempotency_key(fine)}")
+
+    def test_expiring_sessions_get_a_new_expiry_and_key(self, mock_session):
+        mock_session.side_effect = stripe.APIConnectionError("stripe is down")
+        charge_fines(self.today)
+        fine = Payment.objects.get(type=Payment.Type.FINE)
+        old_key = fine_idempotency_key(fine)
+
+        mock_session.side_effect = fake_session
+        later = timezone.now() + timedelta(hours=23, minutes=30)
+        with patch("django.utils.timezone.now", return_value=later):
+            charge_fines(self.today)
+
+        fine.refresh_from_db()
+        self.assertNotEqual(fine_idempotency_key(fine), old_key)
+        self.assertEqual(
+            mock_session.call_args.kwargs["expires_at"], int(fine.session_expires_at.timestamp())
+        )
+
+    def test_same_day_is_charged_once(self, mock_session):
+        charge_fines(self.today)
+        summary = charge_fines(self.today)
+
+        self.assertEqual(summary["fines"], 0)
+        self.assertEqual(Payment.objects.filter(type=Payment.Type.FINE).count(), 1)
+
+    def test_missed_days_are_charged_on_next_run(self, mock_session):
+        FineRun.objects.create(run_date=self.today - timedelta(days=3))
+
+        charge_fines(self.today)
+
+        fine = Payment.objects.get(type=Payment.Type.FINE)
+        days = (self.today - timezone.localdate(self.overdue.expected_return_date)).days
+        self.assertEqual(fine.money_to_pay, days * Decimal("1.50") * FINE_MULTIPLAYER)
+
+    def test_failed_sessions_are_resumed(self, mock_session):
+        mock_session.side_effect = stripe.APIConnectionError("stripe is down")
+        charge_fines(self.today)
+        fine = Payment.objects.get(type=Payment.Type.FINE)
+        self.assertEqual(fine.session_id, "")
+
+        mock_session.side_effect = fake_session
+        later = timezone.now() + timedelta(minutes=10)
+        with patch("django.utils.timezone.now", return_value=later):
+            summary = charge_fines(self.today)
+
+        fine.refresh_from_db()
+        self.assertEqual(summary["sessions"], 1)
+        first, retry = mock_session.call_args_list
+        self.assertEqual(first, retry)
+        self.assertEqual(fine.session_id, f"cs_{fine_idempotency_key(fine)}")
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from books.tests.test_books_api import sample_book
+from books.tests.test_import import IMPORT_URL
+from borrowings.models import Borrowing
+from borrowings.tests.test_borrowings_api import BORROWING_URL, detail_url
+from library_service_api.idempotency import IN_FLIGHT, cache_key
+
+EMPTY_BODY = hashlib.sha256(b"").hexdigest()
+
+
+def authenticated_client(user) -> APIClient:
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    return client
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client = authenticated_client(self.user)
+        self.book = sample_book(inventory=5)
+        self.payload = {
+            "book": self.book.id,
+            "expected_return_date": (timezone.now() + timezone.timedelta(days=3)).isoformat(),
+        }
+
+    def entry_key(self, key):
+        request = SimpleNamespace(method="POST", path=BORROWING_URL)
+        return cache_key(f"user:{self.user.id}", request, key)
+
+    def create(self, key, payload=None, client=None):
+        return (client or self.client).post(
+            BORROWING_URL, payload or self.payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_repeated_create_is_replayed(self):
+        first = self.create("create-1")
+        second = self.create("create-1")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_replay_runs_no_queries(self):
+        self.create("create-1")
+
+        with self.assertNumQueries(0):
+            self.create("create-1")
+
+    def test_different_keys_run_separately(self):
+        self.create("create-1")
+        self.create("create-2")
+
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.create("create-1")
+        res = self.create("create-1", {**self.payload, "book": sample_book(title="Other").id})
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_keys_are_scoped_to_the_user(self):
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+
+        self.create("create-1")
+        res = self.create("create-1", client=authenticated_client(other))
+
+        self.assertNotIn("Idempotent-Replayed", res)
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_repeated_return_is_replayed(self):
+        borrowing_id = self.create("create-1").data["id"]
+        url = f"{detail_url(borrowing_id)}return/"
+
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY="return-1")
+        second = self.client.post(url, HTTP_IDEMPOTENCY_KEY="return-1")
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+
+    def test_duplicate_waits_for_the_request_in_flight(self):
+        entry_key = self.entry_key("create-1")
+        cache.set(entry_key, {"state": IN_FLIGHT, "fingerprint": EMPTY_BODY}, 60)
+
+        def finish():
+            time.sleep(0.2)
+            cache.set(entry_key, {
+                "state": "done",
+                "fingerprint": EMPTY_BODY,
+                "status": 201,
+                "headers": [("Content-Type", "application/json")],
+                "content": b'{"id": 1}',
+            })
+
+        finisher = threading.Thread(target=finish)
+        finisher.start()
+        res = self.client.post(BORROWING_URL, HTTP_IDEMPOTENCY_KEY="create-1")
+        finisher.join()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.content, b'{"id": 1}')
+        self.assertEqual(Borrowing.objects.count(), 0)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_duplicate_gives_up_on_a_stuck_request(self):
+        cache.set(self.entry_key("create-1"), {"state": IN_FLIGHT, "fingerprint": EMPTY_BODY}, 60)
+
+        res = self.client.post(BORROWING_URL, HTTP_IDEMPOTENCY_KEY="create-1")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res["Retry-After"], "1")
+
+    @override_settings(IDEMPOTENCY_MAX_RESPONSE_BYTES=10)
+    def test_large_responses_are_not_stored(self):
+        with self.assertLogs("library_service_api.idempotency", "WARNING"):
+            self.create("create-1")
+            self.create("create-1")
+
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_overlong_key_is_rejected(self):
+        res = self.create("k" * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Borrowing.objects.count(), 0)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_keyed_upload_larger_than_memory_limit_is_streamed(self):
+        admin = get_user_model().objects.create_user("admin@test.com", "testpass", is_staff=True)
+        catalog = "title,author,cover,inventory,daily_fee\n" + "".join(
+            f"Book {index},Author,Hard,1,0.50\n" for index in range(10)
+        )
+
+        responses = [
+            authenticated_client(admin).post(
+                IMPORT_URL, catalog, content_type="text/csv", HTTP_IDEMPOTENCY_KEY="import-1"
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual([res.status_code for res in responses], [200, 200])
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        self.assertEqual(Book.objects.filter(author="Author").count(), 10)
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import BOOK_URL
+from borrowings.tasks import calculate_fines
+
+METRICS_URL = reverse("metrics")
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(email="test@test.com", password="testpass")
+        )
+
+    def test_requests_are_labelled_by_viewset_action(self):
+        labels = {"view": "book-list", "method": "GET", "status": "200"}
+        before = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+
+        self.client.get(BOOK_URL)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"http_request_db_queries_bucket", res.content)
+        self.assertEqual(
+            REGISTRY.get_sample_value("http_request_duration_seconds_count", labels),
+            before + 1
+        )
+
+    @patch("borrowings.tasks.charge_fines", side_effect=RuntimeError("stripe is down"))
+    def test_task_failures_are_counted(self, mock_charge_fines):
+        labels = {"task": calculate_fines.name}
+        before = REGISTRY.get_sample_value("celery_task_failures_total", labels) or 0
+
+        calculate_fines.apply()
+
+        self.assertEqual(REGISTRY.get_sample_value("celery_task_failures_total", labels), before + 1)
+        self.assertIsNotNone(REGISTRY.get_sample_value(
+            "celery_task_duration_seconds_count", {"task": calculate_fines.name, "state": "FAILURE"}
+        ))
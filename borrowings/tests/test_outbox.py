@@ -0,0 +1,201 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import requests
+import stripe
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import sample_book
+from borrowings.models import OutboxMessage
+from borrowings.outbox import (
+    MAX_ATTEMPTS,
+    enqueue,
+    enqueue_payment_session,
+    process_message
+)
+from borrowings.tasks import process_outbox
+from borrowings.telegram_client import TelegramClient
+from borrowings.telegram_helper import (
+    batch_borrowing_notification_message,
+    borrowing_notification_message
+)
+from borrowings.tests.test_borrowings_api import BORROWING_URL, sample_borrowing
+from payments.models import Payment
+
+
+def fake_session(session_id="cs_test_outbox"):
+    return SimpleNamespace(id=session_id, url=f"https://checkout.stripe.com/{session_id}")
+
+
+class BorrowingOutboxTests(TestCase):
+    def setUp(self):
+        # Rate limit buckets live in the cache.
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.telegram = Mock()
+        self.telegram.post.return_value = Mock(status_code=200)
+        patcher = patch(
+            "borrowings.telegram_helper.get_telegram_client",
+            return_value=TelegramClient("token", global_rate=1000, chat_rate=1000, session=self.telegram)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(LAZY_PAYMENT_SESSIONS=False)
+    def test_create_borrowing_enqueues_side_effects(self):
+        book = sample_book(inventory=2)
+        payload = {
+            "book": book.id,
+            "expected_return_date": timezone.now() + timezone.timedelta(days=3),
+        }
+
+        with patch("stripe.checkout.Session.create") as mock_create:
+            res = self.client.post(BORROWING_URL, payload)
+
+        self.assertEqual(res.status_code, 201)
+        mock_create.assert_not_called()
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list("kind", flat=True)),
+            [OutboxMessage.Kind.PAYMENT_SESSION, OutboxMessage.Kind.TELEGRAM]
+        )
+        payment_message = OutboxMessage.objects.get(kind=OutboxMessage.Kind.PAYMENT_SESSION)
+        self.assertEqual(payment_message.payload["borrowing_id"], res.data["id"])
+        self.assertEqual(payment_message.payload["base_url"], "http://testserver/")
+
+    @patch("stripe.checkout.Session.create")
+    def test_payment_session_delivery_is_idempotent(self, mock_create):
+        mock_create.return_value = fake_session()
+        borrowing = sample_borrowing(user=self.user)
+        message = enqueue(
+            OutboxMessage.Kind.PAYMENT_SESSION,
+            {
+                "borrowing_id": borrowing.id,
+                "payment_type": "Payment",
+                "total_price": "3.50",
+                "base_url": "http://testserver/",
+            }
+        )
+
+        self.assertTrue(process_message(message))
+        self.assertTrue(process_message(message))
+
+        payment = Payment.objects.get(borrowing=borrowing)
+        self.assertEqual(payment.session_id, "cs_test_outbox")
+        self.assertEqual(str(payment.money_to_pay), "3.50")
+        self.assertEqual(
+            mock_create.call_args.kwargs["idempotency_key"],
+            message.idempotency_key
+        )
+        self.assertTrue(
+            mock_create.call_args.kwargs["success_url"].startswith("http://testserver/")
+        )
+
+    @patch("stripe.checkout.Session.create")
+    def test_payment_session_retry_sends_the_same_parameters(self, mock_create):
+        mock_create.side_effect = [stripe.APIConnectionError("timed out"), fake_session()]
+        borrowing = sample_borrowing(user=self.user)
+        message = enqueue_payment_session(
+            borrowing, RequestFactory().get("/"), total_price=borrowing.total_price
+        )
+
+        self.assertFalse(process_message(message))
+        with patch("payments.utils.time.time", return_value=time.time() + 600):
+            self.assertTrue(process_message(message))
+
+        first, retry = mock_create.call_args_list
+        self.assertEqual(first.kwargs, retry.kwargs)
+        self.assertEqual(first.kwargs["expires_at"], message.payload["expires_at"])
+        payment = Payment.objects.get(borrowing=borrowing)
+        self.assertEqual(int(payment.session_expires_at.timestamp()), message.payload["expires_at"])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self.telegram.post.side_effect = requests.exceptions.ConnectionError("telegram is down")
+        message = enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "hello"})
+
+        self.assertFalse(process_message(message))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.Status.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertIn("telegram is down", message.last_error)
+
+    def test_delivery_gives_up_after_max_attempts(self):
+        self.telegram.post.side_effect = requests.exceptions.Timeout()
+        message = enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "hello"})
+        message.attempts = MAX_ATTEMPTS - 1
+        message.save()
+
+        process_message(message)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.Status.FAILED)
+
+    def test_process_outbox_batches_telegram_messages(self):
+        enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "first"})
+        enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "second"})
+
+        result = process_outbox()
+
+        self.assertEqual(result, {"delivered": 2, "failed": 0})
+        self.assertEqual(self.telegram.post.call_count, 1)
+        self.assertEqual(self.telegram.post.call_args.kwargs["data"]["text"], "first\n\nsecond")
+        self.assertFalse(
+            OutboxMessage.objects.filter(status=OutboxMessage.Status.PENDING).exists()
+        )
+
+    def test_malformed_digest_is_retried_message_by_message(self):
+        def post(url, data, timeout):
+            if "<broken" not in data["text"]:
+                return Mock(status_code=200)
+            response = Mock(status_code=400)
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+            return response
+
+        self.telegram.post.side_effect = post
+        good = enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "first"})
+        bad = enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "<broken"})
+        other = enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "third"})
+
+        result = process_outbox()
+
+        self.assertEqual(result, {"delivered": 2, "failed": 1})
+        for message, status in (
+                (good, OutboxMessage.Status.SENT),
+                (bad, OutboxMessage.Status.PENDING),
+                (other, OutboxMessage.Status.SENT),
+        ):
+            message.refresh_from_db()
+            self.assertEqual(message.status, status)
+        self.assertEqual(bad.attempts, 1)
+
+    def test_notifications_escape_html(self):
+        book = sample_book(title="Cats & <Dogs>")
+        borrowing = sample_borrowing(user=self.user, book=book)
+
+        self.assertIn("Cats &amp; &lt;Dogs&gt;", borrowing_notification_message(borrowing))
+        self.assertIn("Cats &amp; &lt;Dogs&gt;", batch_borrowing_notification_message([borrowing]))
+
+    def test_rate_limited_delivery_waits_without_using_an_attempt(self):
+        self.telegram.post.return_value = Mock(
+            status_code=429,
+            json=Mock(return_value={"ok": False, "parameters": {"retry_after": 30}})
+        )
+        message = enqueue(OutboxMessage.Kind.TELEGRAM, {"text": "hello"})
+
+        result = process_outbox()
+
+        message.refresh_from_db()
+        self.assertEqual(result, {"delivered": 0, "failed": 1})
+        self.assertEqual(message.attempts, 0)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timezone.timedelta(seconds=25))
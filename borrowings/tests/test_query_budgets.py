@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import sample_book
+from borrowings.models import Borrowing
+from borrowings.tasks import check_overdue_borrowings
+from borrowings.tests.test_borrowings_api import BORROWING_URL, detail_url
+from library_service_api.query_budget import (
+    QueryBudgetExceeded,
+    QueryBudgetTestMixin,
+    recording_queries
+)
+from payments.tests.test_payments_api import sample_payment
+
+
+class BorrowingQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.com", password="testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.borrowings = [
+            Borrowing.objects.create(
+                book=sample_book(title=f"Book {index}"),
+                user=self.user,
+                expected_return_date=timezone.now() - timezone.timedelta(days=index + 1)
+            )
+            for index in range(5)
+        ]
+        for borrowing in self.borrowings:
+            sample_payment(borrowing, session_id=f"cs_budget_{borrowing.id}")
+
+    def test_list(self):
+        with self.assertQueryBudget("borrowing-list"):
+            self.client.get(BORROWING_URL)
+
+    def test_retrieve(self):
+        with self.assertQueryBudget("borrowing-retrieve"):
+            self.client.get(detail_url(self.borrowings[0].id))
+
+    def test_create(self):
+        payload = {
+            "book": sample_book(title="New").id,
+            "expected_return_date": timezone.now() + timezone.timedelta(days=3),
+        }
+
+        with self.assertQueryBudget("borrowing-create"):
+            self.client.post(BORROWING_URL, payload)
+
+    def test_return(self):
+        with self.assertQueryBudget("borrowing-return_borrowing"):
+            self.client.post(f"{detail_url(self.borrowings[0].id)}return/")
+
+    def test_batch_create(self):
+        payload = {
+            "books": [sample_book(title=f"New {index}").id for index in range(5)],
+            "expected_return_date": timezone.now() + timezone.timedelta(days=3),
+        }
+
+        with self.assertQueryBudget("borrowing-batch_create"):
+            res = self.client.post(f"{BORROWING_URL}batch/", payload, format="json")
+        self.assertEqual(res.status_code, 201)
+
+    def test_batch_return(self):
+        payload = {"borrowings": [borrowing.id for borrowing in self.borrowings]}
+
+        with self.assertQueryBudget("borrowing-batch_return"):
+            res = self.client.post(f"{BORROWING_URL}batch/return/", payload, format="json")
+        self.assertEqual(len(res.data["returned"]), 5)
+
+    @patch("borrowings.tasks.send_telegram_message")
+    def test_overdue_scan(self, mock_send):
+        with self.assertQueryBudget("borrowings.tasks.check_overdue_borrowings"):
+            check_overdue_borrowings()
+
+    def test_report_points_at_repeated_queries(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with self.assertQueryBudget("book-retrieve"):
+                for borrowing in Borrowing.objects.all():
+                    borrowing.book.title
+
+        report = str(raised.exception)
+        self.assertIn("ran 6 queries, budget is 1", report)
+        self.assertIn("5x SELECT", report)
+        self.assertIn("test_query_budgets.py", report)
+
+    def test_recording_covers_every_connection(self):
+        with recording_queries() as recorder:
+            Borrowing.objects.count()
+
+        self.assertEqual(len(recorder), 1)
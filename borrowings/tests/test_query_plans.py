@@ -0,0 +1,49 @@
+import json
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from borrowings.management.commands.check_query_plans import used_indexes
+
+
+class QueryPlanTests(TestCase):
+    def test_indexes_are_found_in_nested_plans(self):
+        plan = {
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "payments_payment"},
+                {
+                    "Node Type": "Bitmap Heap Scan",
+                    "Relation Name": "borrowings_borrowing",
+                    "Plans": [
+                        {"Node Type": "Bitmap Index Scan", "Index Name": "borrowing_overdue_idx"},
+                    ],
+                },
+            ],
+        }
+
+        self.assertEqual(used_indexes(plan), ["borrowing_overdue_idx"])
+
+    @patch("borrowings.management.commands.check_query_plans.connection")
+    def test_other_index_fails_the_check(self, mock_connection):
+        mock_connection.vendor = "postgresql"
+        plan = [{
+            "Plan": {"Node Type": "Index Scan", "Index Name": "borrowings_borrowing_pkey"},
+            "Execution Time": 0.1,
+        }]
+
+        with patch("django.db.models.QuerySet.explain", return_value=json.dumps(plan)):
+            with self.assertRaisesMessage(CommandError, "expected borrowing_active_user_idx"):
+                call_command("check_query_plans", stdout=StringIO())
+
+    @skipUnless(connection.vendor == "postgresql", "Query plans need PostgreSQL.")
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+
+        call_command("check_query_plans", stdout=out)
+
+        self.assertIn("All hot queries use indexes.", out.getvalue())
@@ -0,0 +1,150 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.cache import get_or_fetch
+from borrowings.models import Borrowing
+from borrowings.tests.test_borrowings_api import BORROWING_URL, sample_borrowing
+from library_service_api import replicas
+from library_service_api.change_markers import touch
+from library_service_api.replicas import STICKY_COOKIE, ReplicaMiddleware
+from users.authentication import get_cached_user
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        replicas._lag_checked.clear()
+        self.factory = RequestFactory()
+        self.reads = []
+        for name, value in (("replica_aliases", ["replica_1"]), ("replica_lag", 0.0)):
+            patcher = patch.object(replicas, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def call(self, request, write=False):
+        def view(request):
+            if write:
+                router.db_for_write(Borrowing)
+            self.reads.append(router.db_for_read(Borrowing) or "default")
+            return HttpResponse()
+
+        return ReplicaMiddleware(view)(request)
+
+    def test_reads_go_to_a_replica(self):
+        self.call(self.factory.get("/api/v1/books/"))
+
+        self.assertEqual(self.reads, ["replica_1"])
+        self.assertEqual(router.db_for_read(Borrowing), "default")
+
+    def test_unsafe_methods_read_from_primary(self):
+        for method in ("patch", "put", "post", "delete"):
+            self.call(getattr(self.factory, method)("/api/v1/payments/1/"))
+
+        self.assertEqual(self.reads, ["default"] * 4)
+
+    def test_writer_reads_from_primary_until_sticky_window_ends(self):
+        response = self.call(self.factory.post("/api/v1/borrowings/"), write=True)
+        request = self.factory.get("/api/v1/borrowings/")
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+
+        self.call(request)
+
+        self.assertEqual(self.reads, ["default", "default"])
+
+    def test_user_is_sticky_across_clients(self):
+        user = get_user_model().objects.create_user(email="test@test.com", password="testpass")
+        write = self.factory.post("/api/v1/borrowings/")
+        write.user = user
+        self.call(write, write=True)
+
+        read = self.factory.get("/api/v1/borrowings/")
+        read.user = user
+        self.call(read)
+
+        self.assertEqual(self.reads[-1], "default")
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with patch.object(replicas, "replica_lag", return_value=60.0):
+            self.call(self.factory.get("/api/v1/books/"))
+
+        self.assertEqual(self.reads, ["default"])
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        def view(request):
+            with transaction.atomic():
+                self.reads.append(router.db_for_read(Borrowing) or "default")
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(self.factory.get("/api/v1/books/"))
+
+        self.assertEqual(self.reads, ["default"])
+
+
+class SharedStateReadsTests(TestCase):
+    """Reads whose results outlive the request go to the primary."""
+
+    def setUp(self):
+        cache.clear()
+        replicas._lag_checked.clear()
+        self.factory = RequestFactory()
+        self.reads = []
+        for name, value in (("replica_aliases", ["replica_1"]), ("replica_lag", 0.0)):
+            patcher = patch.object(replicas, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Record where each read would go, but run it on the test database.
+        route = replicas.RequestRouting.db_for_read
+
+        def db_for_read(routing):
+            self.reads.append(route(routing) or "default")
+            return None
+
+        patcher = patch.object(replicas.RequestRouting, "db_for_read", db_for_read)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user(email="test@test.com", password="testpass")
+
+    def call(self, view):
+        def wrapped(request):
+            view()
+            return HttpResponse()
+
+        ReplicaMiddleware(wrapped)(self.factory.get("/api/v1/books/"))
+
+    def test_catalog_cache_is_filled_from_primary(self):
+        self.call(lambda: get_or_fetch("books:test", lambda: list(Borrowing.objects.all())))
+
+        self.assertEqual(self.reads, ["default"])
+
+    def test_user_cache_is_filled_from_primary(self):
+        self.call(lambda: get_cached_user(self.user.id))
+
+        self.assertEqual(self.reads, ["default"])
+
+    def test_recent_change_is_served_from_primary(self):
+        sample_borrowing(user=self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        touch("borrowings")
+        res = client.get(BORROWING_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.reads)
+        self.assertEqual(set(self.reads), {"default"})
+
+        self.reads.clear()
+        # Once the replicas have caught up with the change, they serve it.
+        with patch(
+                "library_service_api.conditional.replica_visible_before",
+                return_value=float("inf")
+        ):
+            client.get(BORROWING_URL)
+        self.assertIn("replica_1", self.reads)
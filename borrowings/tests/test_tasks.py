@@ -0,0 +1,67 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from books.tests.test_books_api import sample_book
+from borrowings.tasks import OVERDUE_MAX_WAIT, check_overdue_borrowings
+from borrowings.telegram_helper import build_digests
+from borrowings.tests.test_borrowings_api import sample_borrowing
+
+
+class DigestTests(TestCase):
+    def test_entries_are_packed_under_limit(self):
+        entries = [f"entry {index:02}" for index in range(10)]
+
+        digests = list(build_digests(entries, header="head", limit=40))
+
+        self.assertTrue(all(len(digest) <= 40 for digest in digests))
+        self.assertTrue(all(digest.startswith("head") for digest in digests))
+        self.assertEqual(
+            [entry for digest in digests for entry in digest.split("\n\n")[1:]],
+            entries
+        )
+
+    def test_oversized_entry_is_truncated(self):
+        digests = list(build_digests(["x" * 50], limit=10))
+
+        self.assertEqual(digests, ["x" * 10])
+
+    def test_truncation_does_not_split_entities(self):
+        digests = list(build_digests(["Tom & Jerry & Co"], limit=7))
+
+        self.assertEqual(digests, ["Tom &amp; J"])
+
+    def test_no_entries_yield_no_digest(self):
+        self.assertEqual(list(build_digests([], header="head")), [])
+
+
+@patch("borrowings.tasks.send_telegram_message")
+class OverdueScanTests(TestCase):
+    def test_overdue_borrowings_are_sent_as_one_digest(self, mock_send):
+        overdue = timezone.now() - timedelta(days=2)
+        for index in range(5):
+            sample_borrowing(
+                book=sample_book(title=f"<Title {index}>"),
+                expected_return_date=overdue + timedelta(minutes=index)
+            )
+        sample_borrowing(
+            expected_return_date=overdue,
+            actual_return_date=timezone.now()
+        )
+
+        with self.assertNumQueries(1):
+            summary = check_overdue_borrowings()
+
+        self.assertEqual(summary["scanned"], 5)
+        self.assertEqual(summary["messages"], 1)
+        self.assertIn("seconds", summary)
+        message = mock_send.call_args.args[0]
+        self.assertIn("&lt;Title 4&gt;", message)
+
+    def test_no_overdue_borrowings(self, mock_send):
+        summary = check_overdue_borrowings()
+
+        self.assertEqual(summary["scanned"], 0)
+        mock_send.assert_called_once_with("🚫 No borrowings overdue today!", max_wait=OVERDUE_MAX_WAIT)
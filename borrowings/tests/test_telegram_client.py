@@ -0,0 +1,92 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+
+from borrowings.telegram_client import TelegramClient, TelegramRateLimited, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        patcher = patch("library_service_api.throttling.time", Mock(time=self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bucket(self, rate, capacity=1, key="test"):
+        return TokenBucket(key, rate, capacity, sleep=self.clock.sleep)
+
+    def test_burst_up_to_capacity_then_paced(self):
+        bucket = self.bucket(rate=2, capacity=3)
+
+        for _ in range(5):
+            bucket.acquire()
+
+        self.assertEqual(self.clock.now, 1.0)
+
+    def test_buckets_with_the_same_key_share_tokens(self):
+        # As they would in two worker processes.
+        first, second = self.bucket(rate=1), self.bucket(rate=1)
+
+        first.acquire()
+        second.acquire()
+
+        self.assertEqual(self.clock.now, 1.0)
+
+    def test_pause_blocks_until_it_ends(self):
+        bucket = self.bucket(rate=10)
+
+        bucket.pause(30)
+        bucket.acquire()
+
+        self.assertGreaterEqual(self.clock.now, 30)
+
+    def test_waits_no_longer_than_max_wait(self):
+        bucket = self.bucket(rate=10)
+        bucket.pause(30)
+
+        with self.assertRaises(TelegramRateLimited) as raised:
+            bucket.acquire(max_wait=5)
+
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.assertEqual(self.clock.slept, [])
+
+
+class TelegramClientTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reuses_session_and_raises_on_flood_control(self):
+        session = Mock()
+        session.post.side_effect = [
+            Mock(status_code=200, json=Mock(return_value={"ok": True})),
+            Mock(status_code=429, json=Mock(return_value={"parameters": {"retry_after": 7}})),
+        ]
+        client = TelegramClient("token", api_url="http://stub/", global_rate=1000, chat_rate=1000,
+                                session=session)
+
+        client.send_message(1, "first")
+        with self.assertRaises(TelegramRateLimited) as raised:
+            client.send_message(1, "second")
+
+        self.assertEqual(raised.exception.retry_after, 7)
+        self.assertEqual(session.post.call_args.args[0], "http://stub/bottoken/sendMessage")
+        # The chat stays paused, for this client and any other one of the bot.
+        other = TelegramClient("token", global_rate=1000, chat_rate=1000, session=session)
+        with self.assertRaises(TelegramRateLimited):
+            other.send_message(1, "third", max_wait=1)
+        self.assertEqual(session.post.call_count, 2)
@@ -1,13 +1,44 @@
+from collections import Counter
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
+from books.inventory import release_copies, release_copy
 from borrowings.models import Borrowing
-from borrowings.serializers import BorrowingSerializer, BorrowingListSerializer, BorrowingRetrieveSerializer
-from payments.utils import create_stripe_payment_session
+from borrowings.serializers import (
+    MAX_BATCH_SIZE,
+    BatchBorrowingSerializer,
+    BatchReturnSerializer,
+    BorrowingSerializer,
+    BorrowingListSerializer,
+    BorrowingRetrieveSerializer
+)
+from borrowings.outbox import enqueue_batch_payment_session, enqueue_payment_session
+from library_service_api.change_markers import touch_on_commit
+from library_service_api.conditional import ConditionalGetMixin
+from library_service_api.exports import stream_export
+from library_service_api.fast_serializers import FastListMixin, ValuesSerializer
+from payments.serializers import PaymentSerializer
+from payments.utils import create_pending_batch, create_pending_payment
+
+EXPORT_FIELDS = (
+    "id",
+    "user_id",
+    "user__email",
+    "book_id",
+    "book__title",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+)
 
 
 @extend_schema_view(
@@ -58,26 +89,54 @@ from payments.utils import create_stripe_payment_session
         responses={204: None}
     )
 )
-class BorrowingViewSet(viewsets.ModelViewSet):
+class BorrowingViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Borrowing.objects.all()
     serializer_class = BorrowingSerializer
+    values_serializer = ValuesSerializer(
+        BorrowingListSerializer,
+        annotations={
+            "user": Concat("user__first_name", Value(" "), "user__last_name", output_field=CharField())
+        }
+    )
+    cursor_ordering = ("id",)
+    change_scopes = ("borrowings", "books", "payments", "users")
 
     @staticmethod
     def _params_to_int(query_string):
         return [int(str_id) for str_id in query_string.split(",")]
 
+    def get_throttles(self):
+        if self.action in ("create", "batch_create"):
+            self.throttle_scope = "borrowing_create"
+        return super().get_throttles()
+
+    def get_throttle_cost(self, request):
+        # A batch counts as one borrowing per book against borrowing_create.
+        if self.action == "batch_create":
+            data = request.data
+            if hasattr(data, "getlist"):
+                books = data.getlist("books")
+            else:
+                books = data.get("books") if isinstance(data, dict) else None
+            if isinstance(books, list):
+                return max(min(len(books), MAX_BATCH_SIZE), 1)
+        return 1
+
     def get_serializer_class(self):
         if self.action == "list":
             return BorrowingListSerializer
         if self.action == "retrieve":
             return BorrowingRetrieveSerializer
+        if self.action == "batch_create":
+            return BatchBorrowingSerializer
+        if self.action == "batch_return":
+            return BatchReturnSerializer
         return BorrowingSerializer
 
-    def get_queryset(self):
+    def get_filtered_queryset(self):
         queryset = self.queryset
         is_active = self.request.query_params.get("is_active")
         users = self.request.query_params.get("users")
-        queryset = queryset.select_related("user", "book").prefetch_related("payments")
 
         if is_active:
             if is_active.lower() == "true":
@@ -94,14 +153,29 @@ class BorrowingViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def get_queryset(self):
+        queryset = self.get_filtered_queryset().select_related("user", "book")
+
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related("payments")
+
+        return queryset
+
+    def get_values_queryset(self):
+        return self.get_filtered_queryset()
+
     @extend_schema(
         summary="Create a new borrowing",
-        description="Create a borrowing and generate a Stripe payment session.",
+        description="Create a borrowing and its pending payment. The Stripe session is created when the client asks to pay, or queued right away with LAZY_PAYMENT_SESSIONS off.",
         responses={201: BorrowingSerializer}
     )
+    @transaction.atomic
     def perform_create(self, serializer):
         borrowing = serializer.save(user=self.request.user)
-        create_stripe_payment_session(borrowing, self.request, total_price=borrowing.total_price)
+        if settings.LAZY_PAYMENT_SESSIONS:
+            create_pending_payment(borrowing, total_price=borrowing.total_price)
+        else:
+            enqueue_payment_session(borrowing, self.request, total_price=borrowing.total_price)
 
     @extend_schema(
         summary="Mark borrowing as returned",
@@ -113,12 +187,103 @@ class BorrowingViewSet(viewsets.ModelViewSet):
     def return_borrowing(self, request, pk=None):
         with transaction.atomic():
             borrowing = self.get_object()
-            if borrowing.actual_return_date:
+            returned = Borrowing.objects.filter(
+                pk=borrowing.pk,
+                actual_return_date__isnull=True
+            ).update(actual_return_date=timezone.now())
+            if not returned:
                 return Response({"error": "Book already returned"}, status=status.HTTP_400_BAD_REQUEST)
 
-            borrowing.actual_return_date = timezone.now()
-            borrowing.book.inventory += 1
-            borrowing.book.save()
-            borrowing.save()
+            release_copy(borrowing.book_id)
+            touch_on_commit("borrowings")
 
             return Response({"status": "Book returned"}, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Borrow several books at once",
+        description="Create one borrowing per book in a single transaction, all or none. The batch gets one Stripe checkout session for all its payments and one notification.",
+        request=BatchBorrowingSerializer,
+        responses={201: OpenApiParameter(description="Borrowings and payments", name="batch")}
+    )
+    @action(detail=False, methods=["POST"], url_path="batch")
+    def batch_create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            borrowings = serializer.save()
+            payments = create_pending_batch(borrowings)
+            if not settings.LAZY_PAYMENT_SESSIONS:
+                enqueue_batch_payment_session(payments[0].batch_id, request)
+
+        return Response(
+            {
+                "borrowings": BorrowingSerializer(borrowings, many=True).data,
+                "payments": PaymentSerializer(payments, many=True).data,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(
+        summary="Return several borrowings at once",
+        description="Mark borrowings as returned with one update and put their books back on the shelf. Borrowings that were already returned are reported and left unchanged.",
+        request=BatchReturnSerializer,
+        responses={200: OpenApiParameter(description="Returned borrowings", name="batch")}
+    )
+    @action(detail=False, methods=["POST"], url_path="batch/return")
+    def batch_return(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        borrowing_ids = serializer.validated_data["borrowings"]
+
+        with transaction.atomic():
+            # Borrowings, then books, each in primary key order, like every
+            # other writer, so concurrent returns cannot deadlock.
+            rows = list(
+                self.get_filtered_queryset().select_for_update()
+                .filter(pk__in=borrowing_ids)
+                .order_by("pk")
+                .values_list("pk", "book_id", "actual_return_date")
+            )
+            found = {pk for pk, _, _ in rows}
+            missing = [pk for pk in borrowing_ids if pk not in found]
+            if missing:
+                return Response(
+                    {"borrowings": [f"Borrowings not found: {missing}."]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            active = [(pk, book_id) for pk, book_id, returned_at in rows if returned_at is None]
+            if active:
+                Borrowing.objects.filter(pk__in=[pk for pk, _ in active]).update(
+                    actual_return_date=timezone.now()
+                )
+                release_copies(Counter(book_id for _, book_id in active))
+                touch_on_commit("borrowings")
+
+        return Response(
+            {
+                "returned": [pk for pk, _ in active],
+                "already_returned": sorted(found.difference(pk for pk, _ in active)),
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @extend_schema(
+        summary="Export borrowings",
+        description="Staff can stream every borrowing matching the is_active and users filters as NDJSON or CSV, gzipped when the client accepts it.",
+        parameters=[
+            OpenApiParameter(
+                name="export_format",
+                description="Export format",
+                required=False,
+                type=str,
+                enum=["ndjson", "csv"]
+            )
+        ],
+        responses={200: OpenApiParameter(description="Streamed export", name="export")}
+    )
+    @action(detail=False, methods=["GET"], permission_classes=(IsAdminUser,))
+    def export(self, request):
+        queryset = self.get_filtered_queryset().order_by("id")
+        return stream_export(request, queryset, EXPORT_FIELDS, "borrowings")
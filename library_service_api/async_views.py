@@ -0,0 +1,41 @@
+"""
+DRF views with coroutine handlers, for endpoints that mostly wait on
+external services.
+
+Authentication, permissions and throttling may hit the database or the
+cache, so ``initial`` runs in a worker thread; the handler itself runs on
+the event loop and should use the async ORM or ``sync_to_async`` for
+database work. Under ASGI a request waiting on such a handler holds no
+database connection or transaction.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # OPTIONS and 405s are answered by DRF's synchronous handlers.
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
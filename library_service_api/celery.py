@@ -16,6 +16,10 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Register the task metrics and query budget checks.
+import library_service_api.metrics  # noqa: E402, F401
+import library_service_api.query_budget  # noqa: E402, F401
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
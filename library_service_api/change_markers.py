@@ -0,0 +1,48 @@
+"""
+Per-table change markers.
+
+A marker is a ``(version, timestamp)`` pair stored in the shared cache and
+replaced on every write to the table it covers. Reading one is a single
+cache hit, which makes markers cheap enough to build cache keys and HTTP
+validators without touching the database.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+MARKER_KEY = "changes:{}"
+
+
+def _new_marker() -> tuple[int, float]:
+    # Versions never restart from a small number after an eviction, so a
+    # marker can't return to a value that was handed out before.
+    return time.time_ns(), time.time()
+
+
+def get_marker(scope: str) -> tuple[int, float]:
+    key = MARKER_KEY.format(scope)
+    marker = cache.get(key)
+    if marker is None:
+        cache.add(key, _new_marker(), timeout=None)
+        marker = cache.get(key)
+    return marker
+
+
+def get_markers(*scopes: str) -> list[tuple[int, float]]:
+    return [get_marker(scope) for scope in scopes]
+
+
+def touch(*scopes: str) -> None:
+    marker = _new_marker()
+    cache.set_many({MARKER_KEY.format(scope): marker for scope in scopes}, timeout=None)
+
+
+def touch_on_commit(*scopes: str) -> None:
+    """
+    Touch the markers now and once more when the transaction commits, so
+    a read that raced with the write can't be remembered under the new
+    marker.
+    """
+    touch(*scopes)
+    transaction.on_commit(lambda: touch(*scopes))
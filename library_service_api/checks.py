@@ -0,0 +1,31 @@
+"""
+System checks for deployment settings the rest of the code relies on.
+
+Catalog invalidation, change markers, throttles, user invalidation and
+Idempotency-Key deduplication all coordinate workers through the default
+cache, so it must be shared between processes.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=False)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            f"The default cache ({backend}) is not shared between processes.",
+            hint=(
+                "Set REDIS_URL. Without it, cache invalidation, throttles and "
+                "Idempotency-Key deduplication only hold within one worker process."
+            ),
+            id="library_service_api.W001",
+        )
+    ]
@@ -0,0 +1,68 @@
+import hashlib
+import math
+import time
+from contextlib import nullcontext
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from library_service_api.change_markers import get_markers
+from library_service_api.replicas import primary_reads, replica_visible_before
+
+
+class ConditionalGetMixin:
+    """
+    Answer list and retrieve with ``304 Not Modified`` when nothing the
+    response depends on has changed since the client's copy.
+
+    Validators are derived from the change markers of ``change_scopes``,
+    so they are known before the queryset is evaluated or serialized.
+    ``Last-Modified`` has whole-second precision, so it is only sent once
+    the second of the last change is over; until then a later write in
+    that second would not change it, and only the ETag is used.
+    While the last change may not have reached the replicas yet, the body
+    is read from the primary, or a stale body would go out under the new
+    validators and be confirmed by 304s from then on.
+    """
+    change_scopes = ()
+
+    def get_validators(self, request, markers) -> tuple[str, int | None]:
+        user = request.user
+        source = ":".join([
+            *(str(version) for version, _ in markers),
+            str(user.pk),
+            str(user.is_staff),
+            request.get_host(),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+        ])
+        etag = f'"{hashlib.sha256(source.encode()).hexdigest()[:32]}"'
+        last_modified = math.ceil(max(timestamp for _, timestamp in markers))
+        if last_modified > time.time():
+            last_modified = None
+        return etag, last_modified
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        markers = get_markers(*self.change_scopes)
+        etag, last_modified = self.get_validators(request, markers)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            changed_at = max(timestamp for _, timestamp in markers)
+            recent = changed_at > replica_visible_before()
+            with primary_reads() if recent else nullcontext():
+                response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            response["Cache-Control"] = "private, no-cache"
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,51 @@
+"""
+Database connection strategies, picked with ``DB_CONNECTION_MODE``.
+
+- ``none``: a new connection per request (Django's default).
+- ``persistent``: each worker keeps its connection for ``DB_CONN_MAX_AGE``
+  seconds and checks it is still alive before reusing it.
+- ``pool``: psycopg's connection pool, shared by the threads of a worker.
+- ``pgbouncer``: persistent connections to PgBouncer in transaction
+  pooling mode, which cannot carry server-side cursors or prepared
+  statements from one transaction to the next.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+CONNECTION_MODES = ("none", "persistent", "pool", "pgbouncer")
+
+
+def connection_settings(mode: str) -> dict:
+    """Return the ``DATABASES`` entries for a connection mode."""
+    conn_max_age = int(os.getenv("DB_CONN_MAX_AGE", 600))
+
+    if mode == "none":
+        return {"CONN_MAX_AGE": 0}
+    if mode == "persistent":
+        return {"CONN_MAX_AGE": conn_max_age, "CONN_HEALTH_CHECKS": True}
+    if mode == "pool":
+        from psycopg_pool import ConnectionPool
+
+        return {
+            # Django refuses persistent connections on top of a pool.
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+                    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                    "timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+                    "check": ConnectionPool.check_connection,
+                },
+            },
+        }
+    if mode == "pgbouncer":
+        return {
+            "CONN_MAX_AGE": conn_max_age,
+            "CONN_HEALTH_CHECKS": True,
+            "DISABLE_SERVER_SIDE_CURSORS": True,
+            "OPTIONS": {"prepare_threshold": None},
+        }
+    raise ImproperlyConfigured(
+        f"DB_CONNECTION_MODE must be one of {', '.join(CONNECTION_MODES)}, not {mode!r}."
+    )
@@ -0,0 +1,98 @@
+"""
+Read-only fast path for list serializers.
+
+``ValuesSerializer`` renders the same JSON shape as a DRF serializer from
+``values()`` rows. Columns and per-field converters are compiled once
+from the serializer's own fields, so the output keeps using their
+``to_representation``, but no model instances are built per row.
+"""
+from functools import cached_property
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Fields whose representation of a values() column is the column itself.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ValuesSerializer:
+    """
+    ``annotations`` maps field names to query expressions for sources that
+    are not columns, e.g. a ``Concat`` standing in for a model property.
+    """
+
+    def __init__(self, serializer_class, annotations=None):
+        self.serializer_class = serializer_class
+        self.annotations = annotations or {}
+
+    @cached_property
+    def compiled(self):
+        names, columns, converters = [], [], []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.annotations:
+                column = f"fast_{name}"
+            elif isinstance(field, serializers.BaseSerializer) or field.source == "*":
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} cannot be read from values()."
+                )
+            elif isinstance(field, serializers.RelatedField) and not isinstance(
+                    field, serializers.PrimaryKeyRelatedField):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} cannot be read from values()."
+                )
+            else:
+                column = field.source.replace(".", "__")
+            names.append(name)
+            columns.append(column)
+            converters.append(
+                None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            )
+        return tuple(names), tuple(columns), tuple(converters)
+
+    def fetch(self, queryset):
+        _, columns, _ = self.compiled
+        return queryset.annotate(**{
+            f"fast_{name}": expression for name, expression in self.annotations.items()
+        }).values(*columns)
+
+    def serialize(self, rows) -> list[dict]:
+        getters = tuple(zip(*self.compiled))
+        return [
+            {
+                name: value if convert is None or value is None else convert(value)
+                for name, column, convert in getters
+                for value in (row[column],)
+            }
+            for row in rows
+        ]
+
+
+class FastListMixin:
+    """
+    Serve ``list`` through the view's ``values_serializer`` when
+    ``FAST_LIST_SERIALIZATION`` is on.
+    """
+    values_serializer = None
+
+    def get_values_queryset(self):
+        return self.get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer is None or not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.values_serializer.fetch(self.filter_queryset(self.get_values_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.serialize(page))
+
+        return Response(self.values_serializer.serialize(rows))
@@ -0,0 +1,172 @@
+"""
+``Idempotency-Key`` support for mutating requests.
+
+The first request with a given key runs and its response is stored in
+the cache (Redis in production) for ``IDEMPOTENCY_KEY_TTL`` seconds.
+Repeats of that request replay the stored response with one cache read.
+Repeats that arrive while the first is still running wait for it instead
+of running again. Keys are scoped to the caller and the endpoint, and
+reusing a key with a different body is rejected.
+
+Request bodies larger than ``DATA_UPLOAD_MAX_MEMORY_SIZE``, such as
+streamed catalog imports, are not read here, since that would buffer them
+in memory; they are told apart by length only.
+
+Responses larger than ``IDEMPOTENCY_MAX_RESPONSE_BYTES`` are not stored.
+Together with the TTL this bounds every entry; the cache's own eviction
+(Redis ``maxmemory-policy``, ``MAX_ENTRIES`` elsewhere) bounds the store.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+IDEMPOTENT_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+IN_FLIGHT = "in_flight"
+# Answers that depend on the moment rather than on the request.
+UNSTORED_STATUSES = (401, 403, 408, 409, 429)
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+_jwt = JWTAuthentication()
+
+
+def caller(request) -> str | None:
+    """
+    Who sent the request: the JWT user, the session user or, for anonymous
+    requests, the client address. ``None`` for an invalid token, which the
+    view rejects anyway. Tokens are only verified, never looked up.
+    """
+    header = _jwt.get_header(request)
+    if header is not None:
+        raw_token = _jwt.get_raw_token(header)
+        if raw_token is None:
+            return None
+        try:
+            token = _jwt.get_validated_token(raw_token)
+        except InvalidToken:
+            return None
+        return f"user:{token.get(api_settings.USER_ID_CLAIM)}"
+
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"anon:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def cache_key(identity: str, request, key: str) -> str:
+    scope = "\n".join((identity, request.method, request.path, key))
+    return f"idempotency:{hashlib.sha256(scope.encode()).hexdigest()}"
+
+
+def fingerprint(request) -> str:
+    """The request body's hash, or its length when it is too large to buffer."""
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if limit is not None and length > limit:
+        return f"length:{length}"
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def stored_response(entry: dict) -> HttpResponse:
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for name, value in entry["headers"]:
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotencyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = request.headers.get(HEADER)
+        if key is None or request.method not in IDEMPOTENT_METHODS:
+            return self.get_response(request)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters long."}, status=400
+            )
+
+        identity = caller(request)
+        if identity is None:
+            return self.get_response(request)
+
+        cache = caches[settings.IDEMPOTENCY_CACHE]
+        entry_key = cache_key(identity, request, key)
+        body_fingerprint = fingerprint(request)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        interval = POLL_INTERVAL
+        while not cache.add(
+                entry_key,
+                {"state": IN_FLIGHT, "fingerprint": body_fingerprint},
+                settings.IDEMPOTENCY_LOCK_TIMEOUT
+        ):
+            entry = cache.get(entry_key)
+            if entry is None:
+                # Expired or released between our add and get; try again.
+                continue
+            if entry["fingerprint"] != body_fingerprint:
+                return JsonResponse(
+                    {"error": f"This {HEADER} was already used with a different request body."},
+                    status=422
+                )
+            if entry["state"] != IN_FLIGHT:
+                return stored_response(entry)
+            if time.monotonic() >= deadline:
+                response = JsonResponse(
+                    {"error": f"A request with this {HEADER} is still in progress."}, status=409
+                )
+                response["Retry-After"] = "1"
+                return response
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            cache.delete(entry_key)
+            raise
+        self.store(cache, entry_key, body_fingerprint, response)
+        return response
+
+    @staticmethod
+    def store(cache, entry_key: str, fingerprint: str, response) -> None:
+        if (
+                response.streaming
+                or response.status_code >= 500
+                or response.status_code in UNSTORED_STATUSES
+        ):
+            cache.delete(entry_key)
+            return
+        if len(response.content) > settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+            logger.warning("Response of %s bytes is too large to store for replay.", len(response.content))
+            cache.delete(entry_key)
+            return
+
+        cache.set(
+            entry_key,
+            {
+                "state": "done",
+                "fingerprint": fingerprint,
+                "status": response.status_code,
+                "headers": list(response.items()),
+                "content": response.content,
+            },
+            settings.IDEMPOTENCY_KEY_TTL
+        )
@@ -0,0 +1,154 @@
+"""
+Prometheus metrics for requests, database queries, external calls and
+Celery tasks, exposed in text format at ``/metrics``.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (it must exist and be emptied
+before the workers start), every process writes its samples there and
+``/metrics`` aggregates them, so any worker can answer a scrape.
+"""
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from celery.signals import task_failure, task_postrun, task_prerun
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by view.",
+    ("view", "method", "status")
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per request.",
+    ("view",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+)
+REQUEST_QUERY_TIME = Histogram(
+    "http_request_db_query_duration_seconds",
+    "Time spent in database queries per request.",
+    ("view",)
+)
+EXTERNAL_CALL_LATENCY = Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external services.",
+    ("service", "operation", "outcome")
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task duration.",
+    ("task", "state"),
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+)
+TASK_FAILURES = Counter(
+    "celery_task_failures",
+    "Celery task failures.",
+    ("task",)
+)
+
+
+@contextmanager
+def observe_external_call(service: str, operation: str):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_CALL_LATENCY.labels(service, operation, outcome).observe(
+            time.perf_counter() - started
+        )
+
+
+def view_name(request) -> str:
+    """
+    ``<basename>-<action>`` for viewsets, e.g. ``borrowing-list``, and the
+    URL name elsewhere, so labels do not grow with the number of paths.
+    """
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    actions = getattr(match.func, "actions", None)
+    if actions:
+        basename = match.func.initkwargs.get("basename")
+        return f"{basename}-{actions.get(request.method.lower(), 'unknown')}"
+    return match.url_name or match.view_name or "unnamed"
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+
+        view = view_name(request)
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(
+            time.perf_counter() - started
+        )
+        REQUEST_QUERIES.labels(view).observe(queries.count)
+        REQUEST_QUERY_TIME.labels(view).observe(queries.seconds)
+        return response
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+@task_failure.connect
+def count_task_failure(sender=None, **kwargs):
+    TASK_FAILURES.labels(sender.name).inc()
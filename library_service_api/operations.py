@@ -0,0 +1,54 @@
+"""
+Migration operations for PostgreSQL-only index features.
+
+Local setups and tests may run on SQLite, so these operations fall back to
+what the database supports instead of failing ``migrate``: extensions and
+GIN indexes are left out, and concurrent builds become plain ones.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently as BaseAddIndexConcurrently
+from django.contrib.postgres.operations import TrigramExtension as BaseTrigramExtension
+from django.db import migrations
+
+
+def is_postgres(schema_editor) -> bool:
+    return schema_editor.connection.vendor == "postgresql"
+
+
+class TrigramExtension(BaseTrigramExtension):
+    """``TrigramExtension`` that can also be unapplied off PostgreSQL."""
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if is_postgres(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """``AddIndex`` for index types that only PostgreSQL has, e.g. ``GinIndex``."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if is_postgres(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if is_postgres(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddIndexConcurrently(BaseAddIndexConcurrently):
+    """``AddIndexConcurrently`` that builds a plain index elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if is_postgres(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if is_postgres(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
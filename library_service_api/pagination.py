@@ -0,0 +1,79 @@
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+
+MAX_PAGE_SIZE = 100
+
+
+class PageSizePagination(PageNumberPagination):
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination that follows the view's ``cursor_ordering``,
+    so fetching page N costs the same as fetching page 1.
+    """
+    ordering = ("id",)
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, "cursor_ordering", self.ordering)
+
+
+class LibraryPagination(BasePagination):
+    """
+    Page number pagination by default. Clients opt in to keyset
+    pagination with ``?pagination=cursor`` and then follow the
+    ``next``/``previous`` links, which carry the ``cursor`` parameter.
+    """
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+
+    def __init__(self):
+        self.page_number = PageSizePagination()
+        self.keyset = KeysetPagination()
+        self.active = self.page_number
+
+    def use_keyset(self, request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or self.keyset.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.active = self.keyset if self.use_keyset(request) else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = self.page_number.get_schema_operation_parameters(view)
+        parameters += [
+            parameter
+            for parameter in self.keyset.get_schema_operation_parameters(view)
+            if parameter["name"] == self.keyset.cursor_query_param
+        ]
+        parameters.append({
+            "name": self.mode_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Set to 'cursor' for keyset pagination.",
+            "schema": {"type": "string", "enum": [self.cursor_mode]},
+        })
+        return parameters
+
+    def to_html(self):
+        return self.active.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.active, "display_page_controls", False)
@@ -0,0 +1,147 @@
+"""
+Query budgets per viewset action and Celery task.
+
+Budgets are declared as ``QUERY_BUDGETS`` in ``<app>/tests/query_budgets.py``
+and keyed like the request metrics (``borrowing-list``,
+``borrowing-return_borrowing``) or by task name. ``QueryBudgetTestMixin``
+enforces them in tests. Setting ``QUERY_BUDGET_MODE`` to ``log`` or
+``raise`` also checks live requests and tasks. When a budget is exceeded,
+the report lists each distinct query with the project code that issued it.
+"""
+import logging
+import traceback
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from importlib import import_module
+
+from celery.signals import task_postrun, task_prerun
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+from library_service_api.metrics import view_name
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 6
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that keeps each query with the project frames that ran it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, self.call_site()))
+        return execute(sql, params, many, context)
+
+    @staticmethod
+    def call_site() -> list[str]:
+        base_dir = str(settings.BASE_DIR)
+        frames = [
+            frame for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(base_dir)
+            and "site-packages" not in frame.filename
+            and frame.filename != __file__
+        ]
+        return traceback.format_list(frames[-STACK_DEPTH:])
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self, label: str, budget: int) -> str:
+        sites = defaultdict(list)
+        for sql, stack in self.queries:
+            sites[sql].append(stack)
+        lines = [f"{label} ran {len(self)} queries, budget is {budget}:"]
+        # Repeated statements first: that is what an N+1 looks like.
+        for sql, stacks in sorted(sites.items(), key=lambda item: -len(item[1])):
+            lines.append(f"\n{len(stacks)}x {sql}")
+            lines.append("".join(stacks[-1]).rstrip())
+        return "\n".join(lines)
+
+
+@contextmanager
+def recording_queries():
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+@lru_cache(maxsize=None)
+def load_budgets() -> dict:
+    budgets = {}
+    for app_config in apps.get_app_configs():
+        try:
+            module = import_module(f"{app_config.name}.tests.query_budgets")
+        except ImportError:
+            continue
+        budgets.update(module.QUERY_BUDGETS)
+    return budgets
+
+
+def check_budget(label: str, recorder: QueryRecorder, mode: str = "raise") -> None:
+    budget = load_budgets().get(label)
+    if budget is None or len(recorder) <= budget:
+        return
+    report = recorder.report(label, budget)
+    if mode == "raise":
+        raise QueryBudgetExceeded(report)
+    logger.warning(report)
+
+
+class QueryBudgetTestMixin:
+    @contextmanager
+    def assertQueryBudget(self, label: str):
+        if label not in load_budgets():
+            self.fail(f"No query budget declared for {label}.")
+        with recording_queries() as recorder:
+            yield recorder
+        check_budget(label, recorder)
+
+
+class QueryBudgetMiddleware:
+    """Check live requests against their budgets; enabled by ``QUERY_BUDGET_MODE``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == "off":
+            return self.get_response(request)
+
+        with recording_queries() as recorder:
+            response = self.get_response(request)
+        check_budget(view_name(request), recorder, mode)
+        return response
+
+
+_task_recordings = {}
+
+
+@task_prerun.connect
+def start_task_recording(task_id=None, **kwargs):
+    if settings.QUERY_BUDGET_MODE == "off":
+        return
+    stack = ExitStack()
+    recorder = stack.enter_context(recording_queries())
+    _task_recordings[task_id] = (stack, recorder)
+
+
+@task_postrun.connect
+def check_task_budget(task_id=None, task=None, **kwargs):
+    recording = _task_recordings.pop(task_id, None)
+    if recording is None:
+        return
+    stack, recorder = recording
+    stack.close()
+    check_budget(task.name, recorder, "log")
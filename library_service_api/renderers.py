@@ -0,0 +1,45 @@
+"""
+JSON renderer backed by orjson.
+
+Output matches ``rest_framework.renderers.JSONRenderer``: datetimes, dates
+and times are passed through to DRF's own encoder, which also keeps
+Decimals as strings, and U+2028/U+2029 are escaped. Indented output, the
+non-default ``UNICODE_JSON``/``COMPACT_JSON`` settings and anything orjson
+rejects go through DRF's renderer, as does everything when orjson is not
+installed.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+def dumps(data, default) -> bytes | None:
+    """
+    Encode ``data`` with orjson, handing types it does not render like the
+    stdlib encoder to ``default``. ``None`` if orjson cannot encode it.
+    """
+    if orjson is None:
+        return None
+    try:
+        content = orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return None
+    return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact and not self.ensure_ascii:
+            content = dumps(data, self.encoder_class().default)
+            if content is not None:
+                return content
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,204 @@
+"""
+Read-replica routing.
+
+Every ``DATABASES`` alias starting with ``replica`` is a read replica.
+``ReplicaMiddleware`` opens a routing scope for each request, and
+``ReplicaRouter`` sends the reads of GET, HEAD and OPTIONS requests to a
+replica, except:
+
+- inside a transaction on the primary, where reads must see its writes;
+- for a short window after the client or user wrote something
+  (read-your-writes), tracked with a cookie and a per-user cache key;
+- when every replica lags behind by more than ``REPLICA_MAX_LAG`` seconds;
+- inside ``primary_reads()``, used by code that stores what it reads in a
+  shared cache or answers with validators derived from change markers.
+  Those are current as soon as a write commits, and a lagging read filed
+  under them would be served as current long after the replica caught up.
+
+Other methods read from the primary from the start: a PATCH that loaded
+its object from a lagging replica would write stale fields back, and a
+POST would fail validation on rows the replica has not seen yet. Code
+running outside a request, such as Celery tasks, always reads from the
+primary.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+
+STICKY_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_routing = ContextVar("replica_routing", default=None)
+_lag_lock = threading.Lock()
+_lag_checked = {}
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def sticky_cache_key(user_id) -> str:
+    return f"replica-sticky:{user_id}"
+
+
+def authenticated_user(request):
+    """
+    The user DRF authenticated, if any. Django's lazy session user is not
+    evaluated here, since loading it would itself go through the router.
+    """
+    user = request.__dict__.get("user")
+    if user is None or isinstance(user, SimpleLazyObject) or not user.is_authenticated:
+        return None
+    return user
+
+
+def replica_lag(alias: str) -> float:
+    """Seconds the replica is behind the primary; infinite if it is unreachable."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_QUERY)
+            return float(cursor.fetchone()[0])
+    except Exception:
+        return float("inf")
+
+
+def replica_visible_before() -> float:
+    """
+    Unix time before which every commit is visible on the replicas reads
+    may go to: they lagged at most ``REPLICA_MAX_LAG`` seconds when last
+    measured, at most ``REPLICA_LAG_CHECK_INTERVAL`` seconds ago.
+    """
+    return time.time() - settings.REPLICA_MAX_LAG - settings.REPLICA_LAG_CHECK_INTERVAL
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads of the enclosed block to the primary."""
+    routing = _routing.get()
+    if routing is None:
+        yield
+        return
+    routing.pinned += 1
+    try:
+        yield
+    finally:
+        routing.pinned -= 1
+
+
+def healthy_replicas() -> list[str]:
+    """Replicas within the lag threshold, measuring each at most every few seconds."""
+    now = time.monotonic()
+    healthy = []
+    for alias in replica_aliases():
+        with _lag_lock:
+            checked_at, lag = _lag_checked.get(alias, (None, None))
+        if checked_at is None or now - checked_at > settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag = replica_lag(alias)
+            with _lag_lock:
+                _lag_checked[alias] = (now, lag)
+        if lag <= settings.REPLICA_MAX_LAG:
+            healthy.append(alias)
+    return healthy
+
+
+class RequestRouting:
+    """Routing state of one request."""
+
+    def __init__(self, request):
+        self.request = request
+        self.safe = request.method in SAFE_METHODS
+        try:
+            self.sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            self.sticky = False
+        self.replica = None
+        self.checked_user = None
+        self.wrote = False
+        self.pinned = 0
+        # Transactions opened outside the request (e.g. by tests) do not count.
+        self.atomic_depth = len(connections[DEFAULT_DB_ALIAS].atomic_blocks)
+
+    def user_is_sticky(self) -> bool:
+        user = authenticated_user(self.request)
+        if user is None:
+            return False
+        if self.checked_user != user.pk:
+            self.checked_user = user.pk
+            self.sticky = self.sticky or bool(cache.get(sticky_cache_key(user.pk)))
+        return self.sticky
+
+    def db_for_read(self):
+        in_transaction = len(connections[DEFAULT_DB_ALIAS].atomic_blocks) > self.atomic_depth
+        if not self.safe or self.wrote or self.sticky or self.pinned or in_transaction:
+            return None
+        if self.user_is_sticky():
+            return None
+        if self.replica is None:
+            self.replica = random.choice(healthy_replicas() or [DEFAULT_DB_ALIAS])
+        return self.replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        return routing.db_for_read() if routing else None
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Route the reads of safe requests, and pin writers to the primary for a while."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        routing = RequestRouting(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if routing.wrote:
+            sticky_seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + sticky_seconds),
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite="Lax"
+            )
+            user = authenticated_user(request)
+            if user is not None:
+                cache.set(sticky_cache_key(user.pk), True, sticky_seconds)
+        return response
@@ -14,6 +14,8 @@ from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
+from library_service_api.database import connection_settings
+
 load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "debug_toolbar",
     "rest_framework",
     "rest_framework_simplejwt",
@@ -53,10 +56,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "library_service_api.metrics.MetricsMiddleware",
+    "library_service_api.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "library_service_api.idempotency.IdempotencyMiddleware",
+    "library_service_api.replicas.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -86,6 +93,8 @@ WSGI_APPLICATION = "library_service_api.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+DB_CONNECTION_MODE = os.getenv("DB_CONNECTION_MODE", "persistent")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -94,9 +103,48 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        **connection_settings(DB_CONNECTION_MODE),
     }
 }
 
+# Read replicas share the primary's credentials. Any alias starting with
+# "replica" is used for reads, so other engines can stand in locally.
+for number, host in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), 1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["library_service_api.replicas.ReplicaRouter"]
+
+# Seconds a client reads from the primary after writing.
+REPLICA_STICKY_SECONDS = 5
+# Replicas further behind than this many seconds are skipped.
+REPLICA_MAX_LAG = 2
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    # Per process only; the library_service_api.W001 check warns about it.
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -142,22 +190,49 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": (
+        "library_service_api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "library_service_api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "library_service_api.throttling.AnonGCRAThrottle",
+        "library_service_api.throttling.UserGCRAThrottle",
+        "library_service_api.throttling.ScopedGCRAThrottle",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_THROTTLE_RATES": {"anon": "10000/day", "user": "10000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "10000/day",
+        "user": "10000/day",
+        "token": "10/min",
+        "borrowing_create": "60/hour",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "library_service_api.pagination.LibraryPagination",
     "PAGE_SIZE": 5
 }
 
+# Replay the stored response of a repeated request with the same Idempotency-Key.
+IDEMPOTENCY_CACHE = "default"
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+IDEMPOTENCY_MAX_RESPONSE_BYTES = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE_BYTES", 64 * 1024))
+# How long a first request may run before its key is released, and how
+# long a concurrent repeat waits for it before answering 409.
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+
+# Render list endpoints from values() rows instead of model instances.
+FAST_LIST_SERIALIZATION = os.getenv("FAST_LIST_SERIALIZATION", "true").lower() == "true"
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60 * 60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -173,8 +248,32 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "Europe/Kyiv"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+CELERY_BEAT_SCHEDULE = {
+    "process-outbox": {
+        "task": "borrowings.tasks.process_outbox",
+        "schedule": 30.0,
+    },
+}
 
 STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+# Create checkout sessions when the client asks to pay, not with the payment.
+LAZY_PAYMENT_SESSIONS = os.getenv("LAZY_PAYMENT_SESSIONS", "true").lower() == "true"
+
+# Check requests and Celery tasks against the budgets in <app>/tests/query_budgets.py:
+# "off", "log" or "raise" (tasks only ever log).
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off")
+
+# Bearer token required to scrape /metrics; leave unset on a private network.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Messages per second across all chats, and per chat (Telegram allows 20/min in groups).
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 20 / 60
+
+# Absolute base URL used to build Stripe redirect URLs outside of a request.
+SITE_URL = os.getenv("SITE_URL", "http://127.0.0.1:8000")
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Library Service API",
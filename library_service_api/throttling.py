@@ -0,0 +1,136 @@
+"""
+Shared GCRA throttles.
+
+The generic cell rate algorithm keeps a single timestamp per client, the
+theoretical arrival time (TAT) of its next request, instead of a list of
+past request times. On Redis the check and the update run as one Lua
+script using the Redis clock, so every worker shares the same limit and
+each check is O(1). Other cache backends fall back to get/set, which is
+only atomic within a process and meant for development and tests.
+"""
+import math
+import threading
+import time
+
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle
+)
+
+GCRA_SCRIPT = """
+local now = redis.call("TIME")
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call("GET", KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - period > now then
+    return {0, tostring(new_tat - period - now)}
+end
+redis.call("SET", KEYS[1], tostring(new_tat), "PX", math.ceil((new_tat - now) * 1000))
+return {1, "0"}
+"""
+
+BLOCK_SCRIPT = """
+local now = redis.call("TIME")
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local blocked_tat = now + tonumber(ARGV[1])
+local tat = tonumber(redis.call("GET", KEYS[1])) or now
+if blocked_tat > tat then
+    redis.call("SET", KEYS[1], tostring(blocked_tat), "PX", math.ceil((blocked_tat - now) * 1000))
+end
+return 1
+"""
+
+_fallback_lock = threading.Lock()
+
+
+def gcra(cache, key: str, num_requests: int, duration: int, cost: int = 1) -> tuple[bool, float]:
+    """
+    Allow up to ``num_requests`` per ``duration`` seconds, bursts included,
+    with the request counting as ``cost`` of them.
+    Returns whether the request is allowed and, if not, seconds to wait.
+    """
+    interval = duration / num_requests * cost
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        allowed, wait = client.eval(GCRA_SCRIPT, 1, key, interval, duration)
+        return bool(allowed), float(wait)
+
+    with _fallback_lock:
+        now = time.time()
+        tat = max(cache.get(key, now), now)
+        new_tat = tat + interval
+        if new_tat - duration > now:
+            return False, new_tat - duration - now
+        cache.set(key, new_tat, math.ceil(new_tat - now))
+        return True, 0.0
+
+
+def gcra_block(cache, key: str, seconds: float, num_requests: int, duration: int) -> None:
+    """Deny every request on ``key`` for the next ``seconds``."""
+    # The TAT at which the next request is allowed exactly ``seconds`` from now.
+    offset = seconds + duration - duration / num_requests
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        client.eval(BLOCK_SCRIPT, 1, key, offset)
+        return
+
+    with _fallback_lock:
+        now = time.time()
+        blocked_tat = now + offset
+        if blocked_tat > cache.get(key, now):
+            cache.set(key, blocked_tat, math.ceil(blocked_tat - now))
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """``SimpleRateThrottle`` with the request history replaced by GCRA."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # A request never costs more than the whole budget, or it could never pass.
+        cost = min(self.get_cost(request, view), self.num_requests)
+        allowed, self.retry_after = gcra(
+            self.cache, self.key, self.num_requests, self.duration, cost
+        )
+        return allowed
+
+    def get_cost(self, request, view) -> int:
+        return 1
+
+    def wait(self):
+        return self.retry_after
+
+
+class AnonGCRAThrottle(GCRAThrottle, AnonRateThrottle):
+    pass
+
+
+class UserGCRAThrottle(GCRAThrottle, UserRateThrottle):
+    pass
+
+
+class ScopedGCRAThrottle(ScopedRateThrottle, GCRAThrottle):
+    """
+    Applies to views that set ``throttle_scope``; a no-op elsewhere. Views
+    doing the work of several requests at once can charge for all of them
+    with ``get_throttle_cost(request)``.
+    """
+
+    def get_cost(self, request, view) -> int:
+        get_throttle_cost = getattr(view, "get_throttle_cost", None)
+        return get_throttle_cost(request) if get_throttle_cost else 1
@@ -24,8 +24,11 @@ from drf_spectacular.views import (
     SpectacularRedocView
 )
 
+from library_service_api.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/v1/books/", include("books.urls"), name="books"),
     path("api/v1/user/", include("users.urls"), name="users"),
     path("api/v1/borrowings/", include("borrowings.urls"), name="borrowings"),
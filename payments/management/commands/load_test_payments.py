@@ -0,0 +1,157 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import stripe
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+SESSION_PREFIX = "cs_load_test_"
+LOAD_TEST_EMAIL = "payment-load-test@example.com"
+LOAD_TEST_AUTHOR = "load test"
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """Answers checkout session lookups like Stripe, after a fixed delay."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        session_id = self.path.rstrip("/").rsplit("/", 1)[-1].split("?")[0]
+        payload = json.dumps({
+            "id": session_id,
+            "object": "checkout.session",
+            "payment_status": "paid",
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """Confirm payments concurrently through the ASGI app against a fake Stripe server"""
+
+    help = "Load-test payment confirmations on one ASGI worker against a local fake Stripe."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+        parser.add_argument("--latency", type=float, default=0.2,
+                            help="Seconds the fake Stripe takes per request.")
+
+    def handle(self, *args, **options) -> None:
+        from library_service_api.asgi import application
+
+        # Loads the URLconf, and with it payments.utils, which sets the
+        # Stripe key from settings; the fake key below must come after it.
+        url = reverse("payments:payment-success")
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripeHandler)
+        server.daemon_threads = True
+        server.latency = options["latency"]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        stripe.api_base = f"http://127.0.0.1:{server.server_port}"
+        stripe.api_key = "sk_test_load"
+
+        # The ASGI app uses its own connections, so the data is committed
+        # and deleted at the end rather than rolled back.
+        user, book = self.generate(options["payments"])
+        try:
+            # One event loop for every run, as in a single ASGI worker, with
+            # production settings so the debug toolbar stays out of the way.
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=["localhost"]):
+                asyncio.run(self.run(application, url, user, options["concurrency"]))
+        finally:
+            server.shutdown()
+            user.delete()
+            book.delete()
+
+        self.stdout.write(
+            f"A blocking worker with N threads tops out near N / {options['latency']}s = "
+            f"{1 / options['latency']:.0f} req/s per thread."
+        )
+
+    async def run(self, application, url, user, levels):
+        payments = Payment.objects.filter(borrowing__user=user)
+        session_ids = [session_id async for session_id in payments.values_list("session_id", flat=True)]
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        transport = httpx.ASGITransport(app=application)
+
+        self.stdout.write(f"{'concurrency':>12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}  statuses")
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            for concurrency in levels:
+                await payments.aupdate(status=Payment.Status.PENDING)
+                seconds, latencies, statuses = await self.confirm_all(
+                    client, url, session_ids, headers, concurrency
+                )
+                latencies.sort()
+                self.stdout.write(
+                    f"{concurrency:>12}{len(session_ids) / seconds:>9.1f}"
+                    f"{statistics.median(latencies):>9.0f}"
+                    f"{latencies[int(len(latencies) * 0.95) - 1]:>9.0f}  {dict(statuses)}"
+                )
+
+    @staticmethod
+    async def confirm_all(client, url, session_ids, headers, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        statuses = Counter()
+
+        async def confirm(session_id):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, params={"session_id": session_id}, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(confirm(session_id) for session_id in session_ids))
+        return time.perf_counter() - started, latencies, statuses
+
+    @staticmethod
+    def generate(count: int):
+        # Left over by an interrupted run.
+        get_user_model().objects.filter(email=LOAD_TEST_EMAIL).delete()
+        Book.objects.filter(author=LOAD_TEST_AUTHOR).delete()
+
+        user = get_user_model().objects.create_user(email=LOAD_TEST_EMAIL, password=None)
+        book = Book.objects.create(
+            title="Load test book", author=LOAD_TEST_AUTHOR, cover=Book.Cover.SOFT,
+            inventory=count, daily_fee=1
+        )
+        now = timezone.now()
+        borrowings = Borrowing.objects.bulk_create([
+            Borrowing(user=user, book=book, borrow_date=now,
+                      expected_return_date=now + timezone.timedelta(days=7))
+            for _ in range(count)
+        ])
+        Payment.objects.bulk_create([
+            Payment(
+                borrowing=borrowing,
+                status=Payment.Status.PENDING,
+                type=Payment.Type.PAYMENT,
+                session_url="https://checkout.stripe.com/c/pay/load-test",
+                session_id=f"{SESSION_PREFIX}{borrowing.id}",
+                money_to_pay=7
+            )
+            for borrowing in borrowings
+        ])
+        return user, book
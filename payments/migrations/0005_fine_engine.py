@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings", "0004_outboxmessage"),
+        ("payments", "0004_alter_payment_session_id_alter_payment_session_url"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FineRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("run_date", models.DateField(unique=True)),
+                ("fines", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-run_date"],
+            },
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="fine_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="session_id",
+            field=models.TextField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="session_url",
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("type", "Fine")),
+                fields=("borrowing", "fine_date"),
+                name="unique_fine_per_borrowing_day",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:57
+
+from django.db import migrations, models
+
+from library_service_api.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so writes to large tables are not blocked.
+    atomic = False
+
+    dependencies = [
+        ("borrowings", "0005_borrowing_hot_query_indexes"),
+        ("payments", "0005_fine_engine"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="payment",
+            index=models.Index(
+                condition=models.Q(("status", "Pending")),
+                fields=["type", "id"],
+                name="payment_pending_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="payment",
+            index=models.Index(fields=["session_id"], name="payment_session_id_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_payment_session_expires_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="batch_id",
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
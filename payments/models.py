@@ -16,9 +16,42 @@ class Payment(models.Model):
     status = models.CharField(choices=Status.choices, max_length=7)
     type = models.CharField(choices=Type.choices, max_length=7)
     borrowing = models.ForeignKey(Borrowing, on_delete=models.CASCADE, related_name="payments")
-    session_url = models.URLField(max_length=500)
-    session_id = models.TextField(max_length=500)
+    session_url = models.URLField(max_length=500, blank=True)
+    session_id = models.TextField(max_length=500, blank=True)
+    session_expires_at = models.DateTimeField(null=True, blank=True)
     money_to_pay = models.DecimalField(max_digits=9, decimal_places=2)
+    fine_date = models.DateField(null=True, blank=True)
+    # Payments checked out together share one Stripe session.
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["borrowing", "fine_date"],
+                condition=models.Q(type="Fine"),
+                name="unique_fine_per_borrowing_day"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["type", "id"],
+                condition=models.Q(status="Pending"),
+                name="payment_pending_idx"
+            ),
+            models.Index(fields=["session_id"], name="payment_session_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.borrowing} - {self.money_to_pay} {self.status}"
+
+
+class FineRun(models.Model):
+    run_date = models.DateField(unique=True)
+    fines = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-run_date"]
+
+    def __str__(self):
+        return f"Fines for {self.run_date}: {self.fines}"
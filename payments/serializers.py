@@ -6,4 +6,5 @@ from payments.models import Payment
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
-        fields = ("id", "status", "type", "borrowing", "session_url", "session_id", "money_to_pay",)
+        fields = ("id", "status", "type", "borrowing", "session_url", "session_id", "money_to_pay", "batch_id",)
+        read_only_fields = ("batch_id",)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from payments.models import Payment
+from library_service_api.change_markers import touch_on_commit
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def touch_payments_on_change(sender, **kwargs):
+    touch_on_commit("payments")
@@ -0,0 +1,5 @@
+# Queries per request, counted in tests (savepoints included).
+QUERY_BUDGETS = {
+    "payment-list": 2,
+    "payment-retrieve": 2,
+}
@@ -0,0 +1,35 @@
+"""Local fake of the Stripe webhook sender, used to exercise the receiver."""
+import hmac
+import json
+import time
+import uuid
+from hashlib import sha256
+
+
+def checkout_session_event(event_type: str, session_id: str, payment_status: str = "paid") -> dict:
+    return {
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "data": {
+            "object": {
+                "id": session_id,
+                "object": "checkout.session",
+                "payment_status": payment_status,
+                "status": "expired" if event_type.endswith("expired") else "complete",
+            }
+        },
+    }
+
+
+def sign_event(event: dict, secret: str, timestamp: int = None) -> tuple[str, str]:
+    """Return the JSON payload and the matching ``Stripe-Signature`` header."""
+    payload = json.dumps(event)
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(
+        secret.encode("utf-8"),
+        msg=f"{timestamp}.{payload}".encode("utf-8"),
+        digestmod=sha256
+    ).hexdigest()
+    return payload, f"t={timestamp},v1={signature}"
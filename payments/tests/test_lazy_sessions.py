@@ -0,0 +1,131 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.tests.test_books_api import sample_book
+from borrowings.fines import charge_fines
+from borrowings.models import OutboxMessage
+from borrowings.tests.test_borrowings_api import BORROWING_URL, sample_borrowing
+from payments.models import Payment
+from payments.tests.test_payments_api import sample_payment
+
+
+def pay_url(payment_id):
+    return reverse("payments:payment-pay", args=(payment_id,))
+
+
+def fake_session(session_id):
+    return SimpleNamespace(id=session_id, url=f"https://checkout.stripe.com/{session_id}")
+
+
+@override_settings(LAZY_PAYMENT_SESSIONS=True)
+@patch("stripe.checkout.Session.create_async")
+class LazyPaymentSessionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.borrowing = sample_borrowing(user=self.user)
+        self.payment = sample_payment(self.borrowing, session_id="", session_url="")
+
+    def test_borrowing_creation_does_not_touch_stripe(self, mock_create):
+        payload = {
+            "book": sample_book(title="Lazy").id,
+            "expected_return_date": timezone.now() + timedelta(days=3),
+        }
+
+        with patch("stripe.checkout.Session.create") as mock_sync_create:
+            res = self.client.post(BORROWING_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        mock_sync_create.assert_not_called()
+        payment = Payment.objects.get(borrowing_id=res.data["id"])
+        self.assertEqual(payment.status, Payment.Status.PENDING)
+        self.assertEqual(payment.session_id, "")
+        self.assertFalse(OutboxMessage.objects.filter(kind=OutboxMessage.Kind.PAYMENT_SESSION).exists())
+
+    def test_session_is_created_once_and_reused(self, mock_create):
+        mock_create.return_value = fake_session("cs_lazy")
+
+        first = self.client.get(pay_url(self.payment.id))
+        second = self.client.get(pay_url(self.payment.id))
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["session_id"], "cs_lazy")
+        self.assertEqual(second.data["session_url"], "https://checkout.stripe.com/cs_lazy")
+        mock_create.assert_called_once()
+        self.payment.refresh_from_db()
+        self.assertGreater(self.payment.session_expires_at, timezone.now() + timedelta(hours=23))
+
+    def test_session_close_to_expiry_is_replaced(self, mock_create):
+        Payment.objects.filter(pk=self.payment.pk).update(
+            session_id="cs_old",
+            session_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        mock_create.return_value = fake_session("cs_new")
+
+        res = self.client.get(pay_url(self.payment.id))
+
+        self.assertEqual(res.data["session_id"], "cs_new")
+
+    def test_expired_payment_is_reopened(self, mock_create):
+        Payment.objects.filter(pk=self.payment.pk).update(
+            status=Payment.Status.EXPIRED,
+            session_id="cs_expired",
+            session_expires_at=timezone.now() - timedelta(hours=1)
+        )
+        mock_create.return_value = fake_session("cs_reopened")
+
+        res = self.client.get(pay_url(self.payment.id))
+
+        self.assertEqual(res.data["status"], Payment.Status.PENDING)
+        self.assertEqual(res.data["session_id"], "cs_reopened")
+
+    def test_concurrently_stored_session_wins(self, mock_create):
+        async def store_first(**kwargs):
+            await Payment.objects.filter(pk=self.payment.pk).aupdate(
+                session_id="cs_winner",
+                session_expires_at=timezone.now() + timedelta(hours=24)
+            )
+            return fake_session("cs_loser")
+
+        mock_create.side_effect = store_first
+
+        with patch("payments.utils.touch_on_commit") as mock_touch:
+            res = self.client.get(pay_url(self.payment.id))
+
+        self.assertEqual(res.data["session_id"], "cs_winner")
+        mock_touch.assert_not_called()
+
+    def test_paid_payment_is_rejected(self, mock_create):
+        Payment.objects.filter(pk=self.payment.pk).update(status=Payment.Status.PAID)
+
+        res = self.client.get(pay_url(self.payment.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_create.assert_not_called()
+
+    def test_other_users_payment_is_not_found(self, mock_create):
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        payment = sample_payment(sample_borrowing(user=other), session_id="")
+
+        res = self.client.get(pay_url(payment.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fines_get_no_sessions_up_front(self, mock_create):
+        sample_borrowing(expected_return_date=timezone.now() - timedelta(days=3))
+
+        with patch("borrowings.fines.create_checkout_session") as mock_sync_create:
+            summary = charge_fines(timezone.localdate())
+
+        self.assertEqual(summary["sessions"], 0)
+        mock_sync_create.assert_not_called()
+        self.assertTrue(Payment.objects.filter(type=Payment.Type.FINE, session_id="").exists())
@@ -1,7 +1,9 @@
 from datetime import timedelta
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.http import HttpRequest
 from django.test import TestCase
 from django.urls import reverse
@@ -67,6 +69,10 @@ class UnauthenticatedPaymentApiTests(TestCase):
         res = self.client.get(PAYMENT_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_async_views_require_auth(self):
+        res = self.client.get(f"{reverse('payments:payment-success')}?session_id=cs_test")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class AuthenticatedPaymentApiTests(TestCase):
     def setUp(self):
@@ -110,7 +116,7 @@ class AuthenticatedPaymentApiTests(TestCase):
         self.assertEqual(payments.count(), 1)
         self.assertEqual(payments.first().money_to_pay, total_price)
 
-    @patch("stripe.checkout.Session.retrieve")
+    @patch("stripe.checkout.Session.retrieve_async")
     def test_payment_success(self, mock_stripe_retrieve):
         payment = sample_payment(borrowing=self.borrowing)
         payment.session_id = "test_session_id"
@@ -128,8 +134,10 @@ class AuthenticatedPaymentApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(payment.status, Payment.Status.PAID)
 
-    def test_payment_renew(self):
+    @patch("stripe.checkout.Session.create_async")
+    def test_payment_renew(self, mock_stripe_create):
         payment = sample_payment(borrowing=self.borrowing)
+        mock_stripe_create.return_value = Mock(id="cs_renewed", url="https://checkout.stripe.com/renewed")
         url = reverse("payments:payment-renew")
 
         res = self.client.post(url, {"session_id": payment.session_id})
@@ -139,6 +147,27 @@ class AuthenticatedPaymentApiTests(TestCase):
         self.assertEqual(payments.count(), 1)
         self.assertNotEqual(payments.first().session_id, payment.session_id)
 
+    def test_payment_renew_unknown_session(self):
+        res = self.client.post(reverse("payments:payment-renew"), {"session_id": "cs_unknown"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("stripe.checkout.Session.retrieve_async")
+    def test_payment_success_opens_no_transaction_during_stripe_call(self, mock_stripe_retrieve):
+        sample_payment(borrowing=self.borrowing, session_id="cs_in_flight")
+        atomic_depths = []
+
+        async def retrieve(session_id):
+            atomic_depths.append(len(await sync_to_async(lambda: connection.atomic_blocks)()))
+            return {"id": session_id, "payment_status": "paid"}
+
+        mock_stripe_retrieve.side_effect = retrieve
+        baseline = len(connection.atomic_blocks)
+
+        self.client.get(f"{reverse('payments:payment-success')}?session_id=cs_in_flight")
+
+        self.assertEqual(atomic_depths, [baseline])
+
 
 class AdminPaymentApiTests(TestCase):
     def setUp(self):
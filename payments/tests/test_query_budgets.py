@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from borrowings.tests.test_borrowings_api import sample_borrowing
+from library_service_api.query_budget import QueryBudgetTestMixin
+from payments.tests.test_payments_api import PAYMENT_URL, sample_payment
+
+
+class PaymentQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email="admin@test.com", password="testpass", is_staff=True
+        ))
+        self.payments = [
+            sample_payment(sample_borrowing(), session_id=f"cs_budget_{index}")
+            for index in range(5)
+        ]
+
+    def test_list(self):
+        with self.assertQueryBudget("payment-list"):
+            self.client.get(PAYMENT_URL)
+
+    def test_retrieve(self):
+        with self.assertQueryBudget("payment-retrieve"):
+            self.client.get(reverse("payments:payment-detail", args=(self.payments[0].id,)))
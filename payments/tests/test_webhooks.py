@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from borrowings.models import OutboxMessage
+from borrowings.tasks import check_expired_sessions
+from payments.models import Payment
+from payments.tests.stripe_events import checkout_session_event, sign_event
+from payments.tests.test_payments_api import sample_borrowing, sample_payment
+
+WEBHOOK_URL = reverse("payments:stripe-webhook")
+WEBHOOK_SECRET = "whsec_test"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.borrowing = sample_borrowing()
+
+    def post_event(self, event, secret=WEBHOOK_SECRET):
+        payload, signature = sign_event(event, secret)
+        return self.client.post(
+            WEBHOOK_URL,
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=signature
+        )
+
+    def test_completed_event_marks_payment_paid_once(self):
+        payment = sample_payment(borrowing=self.borrowing, session_id="cs_paid")
+        event = checkout_session_event("checkout.session.completed", "cs_paid")
+
+        res1 = self.post_event(event)
+        res2 = self.post_event(event)
+
+        payment.refresh_from_db()
+        self.assertEqual(res1.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.json()["paid"], 1)
+        self.assertEqual(res2.json()["paid"], 0)
+        self.assertEqual(payment.status, Payment.Status.PAID)
+        self.assertEqual(
+            OutboxMessage.objects.filter(kind=OutboxMessage.Kind.TELEGRAM).count(), 1
+        )
+
+    @override_settings(STRIPE_WEBHOOK_SECRET=None)
+    def test_missing_secret_refuses_events(self):
+        sample_payment(borrowing=self.borrowing, session_id="cs_paid")
+        event = checkout_session_event("checkout.session.completed", "cs_paid")
+
+        with self.assertLogs("payments.views", "ERROR"):
+            res = self.post_event(event)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Payment.objects.filter(status=Payment.Status.PAID).exists())
+
+    def test_expired_event_marks_payment_expired(self):
+        payment = sample_payment(borrowing=self.borrowing, session_id="cs_expired")
+
+        self.post_event(checkout_session_event("checkout.session.expired", "cs_expired"))
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.Status.EXPIRED)
+
+    def test_expired_event_does_not_override_paid(self):
+        payment = sample_payment(
+            borrowing=self.borrowing,
+            session_id="cs_done",
+            status=Payment.Status.PAID
+        )
+
+        self.post_event(checkout_session_event("checkout.session.expired", "cs_done"))
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.Status.PAID)
+
+    def test_unpaid_completed_event_is_ignored(self):
+        payment = sample_payment(borrowing=self.borrowing, session_id="cs_unpaid")
+
+        self.post_event(
+            checkout_session_event("checkout.session.completed", "cs_unpaid", payment_status="unpaid")
+        )
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.Status.PENDING)
+
+    def test_invalid_signature_is_rejected(self):
+        payment = sample_payment(borrowing=self.borrowing, session_id="cs_forged")
+
+        res = self.post_event(
+            checkout_session_event("checkout.session.completed", "cs_forged"),
+            secret="whsec_wrong"
+        )
+
+        payment.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(payment.status, Payment.Status.PENDING)
+
+
+class ReconciliationSweepTests(TestCase):
+    @patch("stripe.checkout.Session.list")
+    def test_sweep_applies_finished_sessions(self, mock_list):
+        borrowing = sample_borrowing()
+        paid = sample_payment(borrowing=borrowing, session_id="cs_paid")
+        expired = sample_payment(borrowing=borrowing, session_id="cs_expired")
+        pending = sample_payment(borrowing=borrowing, session_id="cs_open")
+        sessions = {
+            "complete": [{"id": "cs_paid", "payment_status": "paid"}],
+            "expired": [{"id": "cs_expired", "payment_status": "unpaid"}],
+        }
+        mock_list.side_effect = lambda **kwargs: MagicMock(
+            auto_paging_iter=lambda: iter(sessions[kwargs["status"]])
+        )
+
+        summary = check_expired_sessions()
+
+        self.assertEqual(summary, {"paid": 1, "expired": 1})
+        self.assertEqual(mock_list.call_count, 2)
+        for payment, expected in (
+            (paid, Payment.Status.PAID),
+            (expired, Payment.Status.EXPIRED),
+            (pending, Payment.Status.PENDING),
+        ):
+            payment.refresh_from_db()
+            self.assertEqual(payment.status, expected)
@@ -3,19 +3,23 @@ from rest_framework import routers
 
 from payments.views import (
     PaymentViewSet,
-    payment_success,
+    PaymentPayView,
+    PaymentRenewView,
+    PaymentSuccessView,
     payment_cancel,
-    payment_renew
+    stripe_webhook
 )
 
 router = routers.DefaultRouter()
 router.register("", PaymentViewSet)
 
-urlpatterns = router.urls + [
-    path("success/", payment_success, name="payment-success"),
+urlpatterns = [
+    path("success/", PaymentSuccessView.as_view(), name="payment-success"),
     path("cancel/", payment_cancel, name="payment-cancel"),
-    path("renew-payment/", payment_renew, name="payment-renew"),
-]
+    path("renew-payment/", PaymentRenewView.as_view(), name="payment-renew"),
+    path("webhook/", stripe_webhook, name="stripe-webhook"),
+    path("<int:pk>/pay/", PaymentPayView.as_view(), name="payment-pay"),
+] + router.urls
 
 
 app_name = "payments"
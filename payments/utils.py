@@ -1,44 +1,290 @@
 import time
+import uuid
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from urllib.parse import urljoin
 
 import stripe
 from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
+from django.utils import timezone
 
+from library_service_api.change_markers import touch_on_commit
+from library_service_api.metrics import observe_external_call
 from payments.models import Payment
 
 stripe.api_key = settings.STRIPE_API_KEY
 
+SESSION_LIFETIME = timedelta(hours=24)
+# A stored session closer than this to expiring is replaced, not handed out.
+SESSION_REUSE_MARGIN = timedelta(minutes=10)
 
-def create_stripe_payment_session(borrowing, current_request, payment_type: str = "Payment", total_price: float = 0.0):
-    success_url = current_request.build_absolute_uri(
-        reverse("payments:payment-success")
+
+def build_payment_url(view_name: str, current_request=None, base_url: str = None) -> str:
+    path = reverse(view_name)
+    if current_request is not None:
+        return current_request.build_absolute_uri(path)
+    return urljoin(base_url or settings.SITE_URL, path)
+
+
+def session_expires_at() -> int:
+    """Expiry, as a Unix timestamp, of a checkout session created now."""
+    return int(time.time() + SESSION_LIFETIME.total_seconds())
+
+
+def expiry_datetime(expires_at: int = None):
+    if expires_at is None:
+        return timezone.now() + SESSION_LIFETIME
+    return datetime.fromtimestamp(expires_at, tz=dt_timezone.utc)
+
+
+def checkout_session_params(
+        items,
+        current_request=None,
+        base_url: str = None,
+        expires_at: int = None
+) -> dict:
+    """
+    Parameters of one checkout session for ``items``, pairs of title and
+    price. Callers retrying under an idempotency key pass the same
+    ``expires_at`` every time, as Stripe rejects a retry whose parameters
+    differ from the first request.
+    """
+    success_url = build_payment_url(
+        "payments:payment-success", current_request, base_url
     ) + "?session_id={CHECKOUT_SESSION_ID}"
-    cancel_url = current_request.build_absolute_uri(
-        reverse("payments:payment-cancel")
-    )
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{
-            "price_data": {
-                "currency": "usd",
-                "product_data": {
-                    "name": borrowing.book.title,
+    cancel_url = build_payment_url(
+        "payments:payment-cancel", current_request, base_url
+    )
+    return {
+        "payment_method_types": ["card"],
+        "line_items": [
+            {
+                "price_data": {
+                    "currency": "usd",
+                    "product_data": {
+                        "name": title,
+                    },
+                    "unit_amount": int(total_price * 100),
                 },
-                "unit_amount": int(total_price * 100),
-            },
-            "quantity": 1,
-        }],
-        mode="payment",
-        success_url=success_url,
-        cancel_url=cancel_url,
-        expires_at=int(time.time() + 86400)
-    )
-
-    Payment.objects.create(
-        status="Pending",
-        borrowing=borrowing,
+                "quantity": 1,
+            }
+            for title, total_price in items
+        ],
+        "mode": "payment",
+        "success_url": success_url,
+        "cancel_url": cancel_url,
+        "expires_at": expires_at or session_expires_at(),
+    }
+
+
+def create_batch_checkout_session(
+        items,
+        current_request=None,
+        base_url: str = None,
+        idempotency_key: str = None,
+        expires_at: int = None
+):
+    params = checkout_session_params(items, current_request, base_url, expires_at)
+    with observe_external_call("stripe", "checkout_session_create"):
+        return stripe.checkout.Session.create(**params, idempotency_key=idempotency_key)
+
+
+async def create_batch_checkout_session_async(
+        items,
+        current_request=None,
+        base_url: str = None,
+        idempotency_key: str = None,
+        expires_at: int = None
+):
+    params = checkout_session_params(items, current_request, base_url, expires_at)
+    with observe_external_call("stripe", "checkout_session_create"):
+        return await stripe.checkout.Session.create_async(
+            **params, idempotency_key=idempotency_key
+        )
+
+
+def create_checkout_session(
+        title: str,
+        total_price,
+        current_request=None,
+        base_url: str = None,
+        idempotency_key: str = None,
+        expires_at: int = None
+):
+    return create_batch_checkout_session(
+        [(title, total_price)], current_request, base_url, idempotency_key, expires_at
+    )
+
+
+async def create_checkout_session_async(
+        title: str,
+        total_price,
+        current_request=None,
+        base_url: str = None,
+        idempotency_key: str = None,
+        expires_at: int = None
+):
+    return await create_batch_checkout_session_async(
+        [(title, total_price)], current_request, base_url, idempotency_key, expires_at
+    )
+
+
+def payment_items(payments) -> list[tuple]:
+    """Checkout items for payments with their ``borrowing__book`` loaded."""
+    return [(payment.borrowing.book.title, payment.money_to_pay) for payment in payments]
+
+
+def record_payment_session(
+        borrowing,
+        session,
+        payment_type: str = "Payment",
+        total_price: float = 0.0,
+        expires_at: int = None
+) -> Payment:
+    payment, _ = Payment.objects.get_or_create(
         session_id=session.id,
-        session_url=session.url,
+        defaults={
+            "status": "Pending",
+            "borrowing": borrowing,
+            "session_url": session.url,
+            "session_expires_at": expiry_datetime(expires_at),
+            "type": payment_type,
+            "money_to_pay": total_price
+        }
+    )
+    return payment
+
+
+def create_stripe_payment_session(
+        borrowing,
+        current_request,
+        payment_type: str = "Payment",
+        total_price: float = 0.0,
+        base_url: str = None,
+        idempotency_key: str = None,
+        expires_at: int = None
+):
+    session = create_checkout_session(
+        borrowing.book.title,
+        total_price,
+        current_request=current_request,
+        base_url=base_url,
+        idempotency_key=idempotency_key,
+        expires_at=expires_at
+    )
+    return record_payment_session(borrowing, session, payment_type, total_price, expires_at)
+
+
+@transaction.atomic
+def replace_payment_session(payment, session) -> Payment:
+    """Swap ``payment`` for a pending payment on the new checkout ``session``."""
+    borrowing = payment.borrowing
+    payment.delete()
+    return record_payment_session(borrowing, session, total_price=borrowing.total_price)
+
+
+def create_pending_payment(
+        borrowing,
+        payment_type: str = "Payment",
+        total_price: float = 0.0
+) -> Payment:
+    """A payment without a checkout session yet; see ``attach_checkout_session``."""
+    return Payment.objects.create(
+        borrowing=borrowing,
+        status=Payment.Status.PENDING,
         type=payment_type,
         money_to_pay=total_price
     )
+
+
+def create_pending_batch(borrowings) -> list[Payment]:
+    """Pending payments for borrowings checked out together, paid with one session."""
+    batch_id = uuid.uuid4()
+    payments = Payment.objects.bulk_create([
+        Payment(
+            borrowing=borrowing,
+            status=Payment.Status.PENDING,
+            type=Payment.Type.PAYMENT,
+            money_to_pay=borrowing.total_price,
+            batch_id=batch_id
+        )
+        for borrowing in borrowings
+    ])
+    touch_on_commit("payments")
+    return payments
+
+
+def has_usable_session(payment: Payment) -> bool:
+    return (
+        payment.status == Payment.Status.PENDING
+        and bool(payment.session_id)
+        and payment.session_expires_at is not None
+        and payment.session_expires_at > timezone.now() + SESSION_REUSE_MARGIN
+    )
+
+
+def batch_payments(payment: Payment) -> list[Payment]:
+    """
+    The unpaid payments checked out together with ``payment``, itself
+    included, with their books loaded.
+    """
+    if payment.batch_id is None:
+        return [payment]
+    return list(
+        Payment.objects.select_related("borrowing__book")
+        .filter(batch_id=payment.batch_id, session_id=payment.session_id)
+        .exclude(status=Payment.Status.PAID)
+        .order_by("id")
+    )
+
+
+def attach_checkout_session(payment: Payment, session, expires_at: int = None) -> Payment:
+    """
+    Store a new checkout session on ``payment``, and on the rest of its
+    batch, and reopen it if it had expired. When a concurrent request
+    stored a session first, that one is kept and ours is left to expire
+    unused.
+    """
+    scope = {"pk": payment.pk} if payment.batch_id is None else {"batch_id": payment.batch_id}
+    updated = Payment.objects.filter(
+        **scope,
+        session_id=payment.session_id,
+        status__in=(Payment.Status.PENDING, Payment.Status.EXPIRED)
+    ).update(
+        status=Payment.Status.PENDING,
+        session_id=session.id,
+        session_url=session.url,
+        session_expires_at=expiry_datetime(expires_at)
+    )
+    if updated:
+        touch_on_commit("payments")
+    payment.refresh_from_db()
+    return payment
+
+
+def create_batch_payment_session(
+        batch_id,
+        current_request=None,
+        base_url: str = None,
+        idempotency_key: str = None,
+        expires_at: int = None
+) -> list[Payment]:
+    """Create the one checkout session of a batch that has none yet."""
+    payments = list(
+        Payment.objects.select_related("borrowing__book")
+        .filter(batch_id=batch_id, status=Payment.Status.PENDING, session_id="")
+        .order_by("id")
+    )
+    if not payments:
+        return []
+    session = create_batch_checkout_session(
+        payment_items(payments),
+        current_request=current_request,
+        base_url=base_url,
+        idempotency_key=idempotency_key,
+        expires_at=expires_at
+    )
+    attach_checkout_session(payments[0], session, expires_at)
+    return payments
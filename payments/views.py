@@ -1,15 +1,53 @@
+import logging
+
 import stripe
-from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.http import HttpResponse, JsonResponse
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from rest_framework import viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+    throttle_classes
+)
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
 
-from borrowings.telegram_helper import payment_is_paid_notification
+from library_service_api.async_views import AsyncAPIView
+from library_service_api.conditional import ConditionalGetMixin
+from library_service_api.exports import stream_export
+from library_service_api.fast_serializers import FastListMixin, ValuesSerializer
+from library_service_api.metrics import observe_external_call
 from payments.models import Payment
 from payments.serializers import PaymentSerializer
-from payments.utils import create_stripe_payment_session
+from payments.utils import (
+    attach_checkout_session,
+    batch_payments,
+    create_batch_checkout_session_async,
+    create_checkout_session_async,
+    has_usable_session,
+    payment_items,
+    replace_payment_session
+)
+from payments.webhooks import apply_checkout_sessions, handle_checkout_event
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = (
+    "id",
+    "status",
+    "type",
+    "borrowing_id",
+    "borrowing__user__email",
+    "money_to_pay",
+    "fine_date",
+    "session_id",
+)
 
 
 @extend_schema_view(
@@ -47,9 +85,12 @@ from payments.utils import create_stripe_payment_session
         responses={204: None}
     )
 )
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    values_serializer = ValuesSerializer(PaymentSerializer)
+    cursor_ordering = ("id",)
+    change_scopes = ("payments",)
 
     def get_queryset(self):
         queryset = self.queryset
@@ -59,45 +100,93 @@ class PaymentViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @extend_schema(
+        summary="Export payments",
+        description="Staff can stream every payment as NDJSON or CSV, gzipped when the client accepts it.",
+        parameters=[
+            OpenApiParameter(
+                name="export_format",
+                description="Export format",
+                required=False,
+                type=str,
+                enum=["ndjson", "csv"]
+            )
+        ],
+        responses={200: OpenApiParameter(description="Streamed export", name="export")}
+    )
+    @action(detail=False, methods=["GET"], permission_classes=(IsAdminUser,))
+    def export(self, request):
+        return stream_export(request, self.get_queryset().order_by("id"), EXPORT_FIELDS, "payments")
 
-@extend_schema(
-    summary="Handle successful payment",
-    description="Endpoint to handle a successful payment via Stripe. Updates the payment status to 'Paid' and sends a notification.",
-    parameters=[
-        {
-            "name": "session_id",
-            "in": "query",
-            "description": "The session ID from the Stripe payment",
-            "required": True,
-            "schema": {"type": "string"}
+
+class PaymentSuccessView(AsyncAPIView):
+    @extend_schema(
+        summary="Handle successful payment",
+        description="Endpoint to handle a successful payment via Stripe. Updates the payment status to 'Paid' and sends a notification.",
+        parameters=[
+            {
+                "name": "session_id",
+                "in": "query",
+                "description": "The session ID from the Stripe payment",
+                "required": True,
+                "schema": {"type": "string"}
+            }
+        ],
+        responses={
+            200: {"description": "Payment was successful. Thank you!"},
+            400: {"description": "Session ID is required or invalid."}
         }
-    ],
-    responses={
-        200: {"description": "Payment was successful. Thank you!"},
-        400: {"description": "Session ID is required or invalid."}
-    }
-)
-@api_view(["GET"])
-def payment_success(request):
-    session_id = request.GET.get("session_id")
+    )
+    async def get(self, request):
+        session_id = request.GET.get("session_id")
 
-    if not session_id:
-        return JsonResponse({"error": "Session ID is required."}, status=400)
+        if not session_id:
+            return JsonResponse({"error": "Session ID is required."}, status=400)
 
-    with transaction.atomic():
-        session = stripe.checkout.Session.retrieve(session_id)
+        with observe_external_call("stripe", "checkout_session_retrieve"):
+            session = await stripe.checkout.Session.retrieve_async(session_id)
 
         if session["payment_status"] == "paid":
-            payment = Payment.objects.get(session_id=session_id)
-            payment.status = "Paid"
-            payment.save()
-            payment_is_paid_notification(payment)
-
+            await sync_to_async(apply_checkout_sessions)(paid_session_ids=[session_id])
             return HttpResponse("Payment was successful. Thank you!")
         else:
             return HttpResponse("Payment not successful. Please try again.")
 
 
+class PaymentPayView(AsyncAPIView):
+    @extend_schema(
+        summary="Get the checkout session of a payment",
+        description="Returns the payment with a Stripe checkout session to pay it. The session is created on first use, and again once the previous one expired. Payments checked out in one batch share a session.",
+        request=None,
+        responses={
+            200: PaymentSerializer,
+            400: {"description": "Payment is already paid."},
+            404: {"description": "Payment not found."}
+        }
+    )
+    async def get(self, request, pk):
+        payments = Payment.objects.select_related("borrowing__book")
+        if not request.user.is_staff:
+            payments = payments.filter(borrowing__user=request.user)
+
+        try:
+            payment = await payments.aget(pk=pk)
+        except Payment.DoesNotExist:
+            raise NotFound()
+
+        if payment.status == Payment.Status.PAID:
+            return Response({"error": "Payment is already paid."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not has_usable_session(payment):
+            payments = await sync_to_async(batch_payments)(payment)
+            session = await create_batch_checkout_session_async(
+                payment_items(payments), current_request=request
+            )
+            payment = await sync_to_async(attach_checkout_session)(payment, session)
+
+        return Response(PaymentSerializer(payment).data)
+
+
 @extend_schema(
     summary="Handle canceled payment",
     description="Endpoint to handle a canceled payment. Displays a message to the user.",
@@ -110,38 +199,86 @@ def payment_cancel(request):
     return HttpResponse("Payment was canceled. You can try to pay again within 24 hours.")
 
 
-@extend_schema(
-    summary="Renew a payment session",
-    description="Endpoint to renew an existing Stripe payment session. Deletes the previous payment and creates a new one.",
-    request={
-        "application/json": {
-            "type": "object",
-            "properties": {
-                "session_id": {
-                    "type": "string",
-                    "description": "The Stripe session ID of the expired payment."
-                }
-            },
-            "required": ["session_id"]
+class PaymentRenewView(AsyncAPIView):
+    @extend_schema(
+        summary="Renew a payment session",
+        description="Endpoint to renew an existing Stripe payment session. Deletes the previous payment and creates a new one. The payments of a batch are kept and get one new shared session.",
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "session_id": {
+                        "type": "string",
+                        "description": "The Stripe session ID of the expired payment."
+                    }
+                },
+                "required": ["session_id"]
+            }
+        },
+        responses={
+            200: {"description": "Payment session has been renewed successfully."},
+            400: {"description": "Session ID is required or invalid."}
         }
-    },
+    )
+    async def post(self, request):
+        session_id = request.data.get("session_id")
+
+        if not session_id:
+            return JsonResponse({"error": "Session ID is required."}, status=400)
+
+        payment = await Payment.objects.select_related("borrowing__book").filter(
+            session_id=session_id
+        ).order_by("id").afirst()
+        if payment is None:
+            return JsonResponse({"error": "Session ID is invalid."}, status=400)
+
+        if payment.batch_id is not None:
+            payments = await sync_to_async(batch_payments)(payment)
+            if not payments:
+                return JsonResponse({"error": "Payment is already paid."}, status=400)
+            session = await create_batch_checkout_session_async(
+                payment_items(payments), current_request=request
+            )
+            await sync_to_async(attach_checkout_session)(payment, session)
+            return HttpResponse("Payment session has been renewed successfully.")
+
+        borrowing = payment.borrowing
+        # The old payment is only swapped out, in one short transaction,
+        # once Stripe has answered.
+        session = await create_checkout_session_async(
+            borrowing.book.title, borrowing.total_price, current_request=request
+        )
+        await sync_to_async(replace_payment_session)(payment, session)
+
+        return HttpResponse("Payment session has been renewed successfully.")
+
+
+@extend_schema(
+    summary="Receive Stripe webhook events",
+    description="Signed Stripe webhook receiver. Marks payments as paid on 'checkout.session.completed' and as expired on 'checkout.session.expired'.",
+    request=None,
     responses={
-        200: {"description": "Payment session has been renewed successfully."},
-        400: {"description": "Session ID is required or invalid."}
+        200: {"description": "Event received."},
+        400: {"description": "Invalid payload or signature."},
+        503: {"description": "The webhook signing secret is not configured."}
     }
 )
 @api_view(["POST"])
-def payment_renew(request):
-    session_id = request.data.get("session_id")
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def stripe_webhook(request):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        logger.error("STRIPE_WEBHOOK_SECRET is not set; Stripe webhook events are refused.")
+        return JsonResponse({"error": "Webhook is not configured."}, status=503)
 
-    if not session_id:
-        return JsonResponse({"error": "Session ID is required."}, status=400)
+    try:
+        event = stripe.Webhook.construct_event(
+            request.body,
+            request.META.get("HTTP_STRIPE_SIGNATURE", ""),
+            settings.STRIPE_WEBHOOK_SECRET
+        )
+    except (ValueError, stripe.SignatureVerificationError):
+        return JsonResponse({"error": "Invalid payload or signature."}, status=400)
 
-    with transaction.atomic():
-        payment = Payment.objects.get(session_id=session_id)
-        borrowing = payment.borrowing
-        payment.delete()
-
-        create_stripe_payment_session(borrowing, request, total_price=borrowing.total_price)
-
-        return HttpResponse("Payment session has been renewed successfully.")
+    return JsonResponse({"received": True, **handle_checkout_event(event)})
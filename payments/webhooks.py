@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from borrowings.outbox import enqueue_telegram_message
+from borrowings.telegram_helper import (
+    batch_payment_notification_message,
+    payment_notification_message
+)
+from library_service_api.change_markers import touch_on_commit
+from payments.models import Payment
+
+PAID_EVENTS = ("checkout.session.completed", "checkout.session.async_payment_succeeded")
+EXPIRED_EVENTS = ("checkout.session.expired",)
+
+
+def apply_checkout_sessions(paid_session_ids=(), expired_session_ids=()) -> dict:
+    """
+    Move pending payments to Paid or Expired in bulk. Only pending rows
+    are touched, so replayed events and overlapping reconciliation runs
+    are no-ops, and every payment is announced exactly once.
+    """
+    with transaction.atomic():
+        paid_payments = list(
+            Payment.objects.select_for_update(of=("self",))
+            .select_related("borrowing__user", "borrowing__book")
+            .filter(session_id__in=list(paid_session_ids), status=Payment.Status.PENDING)
+        )
+        Payment.objects.filter(
+            id__in=[payment.id for payment in paid_payments]
+        ).update(status=Payment.Status.PAID)
+        # A batch is paid with one session and announced with one message.
+        by_session = defaultdict(list)
+        for payment in paid_payments:
+            by_session[payment.session_id].append(payment)
+        for payments in by_session.values():
+            enqueue_telegram_message(
+                payment_notification_message(payments[0]) if len(payments) == 1
+                else batch_payment_notification_message(payments)
+            )
+
+        expired = Payment.objects.filter(
+            session_id__in=list(expired_session_ids),
+            status=Payment.Status.PENDING
+        ).update(status=Payment.Status.EXPIRED)
+
+        if paid_payments or expired:
+            touch_on_commit("payments")
+
+    return {"paid": len(paid_payments), "expired": expired}
+
+
+def handle_checkout_event(event) -> dict:
+    session = event["data"]["object"]
+    if event["type"] in PAID_EVENTS and session.get("payment_status") == "paid":
+        return apply_checkout_sessions(paid_session_ids=[session["id"]])
+    if event["type"] in EXPIRED_EVENTS:
+        return apply_checkout_sessions(expired_session_ids=[session["id"]])
+    return {"paid": 0, "expired": 0}
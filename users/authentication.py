@@ -0,0 +1,119 @@
+"""
+JWT authentication without a user query per request.
+
+Users are resolved from a small in-process LRU first, then from the
+shared cache, and only then from the database. Saving or deleting a user
+drops both entries in the process that made the change; other processes
+pick the change up once their short local TTL runs out. Rows are read
+from the primary before they are shared, so a lagging replica cannot put
+back a user that was just changed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from library_service_api.replicas import primary_reads
+
+USER_CACHE_TIMEOUT = 5 * 60
+LOCAL_CACHE_TIMEOUT = 5
+LOCAL_CACHE_SIZE = 1024
+CACHED_FIELDS = (
+    "id", "email", "first_name", "last_name", "is_staff", "is_superuser", "is_active"
+)
+
+
+class LocalTTLCache:
+    """Thread-safe LRU whose entries also expire after ``timeout`` seconds."""
+
+    def __init__(self, maxsize: int, timeout: float):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = LocalTTLCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TIMEOUT)
+
+
+def user_cache_key(user_id) -> str:
+    return f"auth-user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """Return the user with ``user_id`` (other fields deferred), or None."""
+    user_model = get_user_model()
+    values = local_users.get(user_id)
+    if values is None:
+        values = cache.get(user_cache_key(user_id))
+        if values is None:
+            with primary_reads():
+                values = user_model.objects.filter(pk=user_id).values(*CACHED_FIELDS).first()
+            if values is None:
+                return None
+            cache.set(user_cache_key(user_id), values, USER_CACHE_TIMEOUT)
+        local_users.set(user_id, values)
+
+    # from_db expects loaded values in the model's field order.
+    field_names = [
+        field.attname for field in user_model._meta.concrete_fields if field.attname in values
+    ]
+    return user_model.from_db("default", field_names, [values[name] for name in field_names])
+
+
+def invalidate_user(user_id) -> None:
+    local_users.delete(user_id)
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares password hashes, which are not cached.
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
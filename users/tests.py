@@ -1,3 +1,98 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from library_service_api.throttling import ScopedGCRAThrottle, gcra
+from users.authentication import get_cached_user
+
+TOKEN_URL = reverse("users:token_obtain_pair")
+ME_URL = reverse("users:manage")
+BORROWING_URL = reverse("borrowings:borrowing-list")
+
+
+class GCRATests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_allows_burst_up_to_limit_then_waits(self):
+        results = [gcra(cache, "throttle_test", 3, 60) for _ in range(4)]
+
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 20, delta=1)
+
+    def test_keys_are_limited_independently(self):
+        gcra(cache, "throttle_first", 1, 60)
+
+        self.assertEqual(gcra(cache, "throttle_second", 1, 60), (True, 0.0))
+        self.assertFalse(gcra(cache, "throttle_first", 1, 60)[0])
+
+
+class TokenThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user(email="test@test.com", password="testpass")
+
+    @patch.object(ScopedGCRAThrottle, "THROTTLE_RATES", {"token": "2/min"})
+    def test_token_endpoint_has_its_own_stricter_scope(self):
+        payload = {"email": "test@test.com", "password": "testpass"}
+
+        responses = [self.client.post(TOKEN_URL, payload) for _ in range(3)]
+
+        self.assertEqual(
+            [res.status_code for res in responses],
+            [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS]
+        )
+        self.assertIn("Retry-After", responses[-1])
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="test@test.com", password="testpass")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [query["sql"] for query in queries if 'FROM "users_user"' in query["sql"]]
+
+    def test_authenticated_requests_skip_the_user_query(self):
+        self.user_queries(BORROWING_URL)
+
+        self.assertEqual(self.user_queries(BORROWING_URL), [])
+
+    def test_saving_a_user_refreshes_the_cached_copy(self):
+        self.assertFalse(get_cached_user(self.user.id).is_staff)
+
+        self.user.is_staff = True
+        self.user.save()
+
+        self.assertTrue(get_cached_user(self.user.id).is_staff)
+
+    def test_deactivated_user_is_rejected(self):
+        self.user_queries(BORROWING_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(BORROWING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_manage_user_updates_the_full_user(self):
+        res = self.client.patch(ME_URL, {"password": "newpass"})
 
-# Create your tests here.
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("newpass"))
+        self.assertEqual(res.data["email"], "test@test.com")
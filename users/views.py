@@ -1,9 +1,11 @@
+from django.contrib.auth import get_user_model
 from rest_framework import generics
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.settings import api_settings
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.views import TokenObtainPairView
 
+from users.authentication import CachedJWTAuthentication
 from users.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -17,10 +19,15 @@ class LoginUserView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
 
 
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    throttle_scope = "token"
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        # request.user only carries the cached fields.
+        return get_user_model().objects.get(pk=self.request.user.pk)